@@ -123,6 +123,16 @@ class NameGeneration:
         self.L1 = ""
         self.L2 = ""
 
+    def set_pref_list(self, pref_list: List[str]) -> None:
+        """
+        Change the preference list used to generate names, leaving the rest
+        of the generator's state untouched
+
+        :param pref_list: name generation preferences list
+        """
+
+        self.pref_list = pref_list
+
     def _get_values_from_pref_list(self):
         for i in range(0, len(self.pref_list), 3):
             yield (self.pref_list[i], self.pref_list[i + 1], self.pref_list[i + 2])
@@ -142,7 +152,7 @@ class NameGeneration:
                         d = "00"
                     try:
                         d = str(round(int(str(d.microsecond)[:3]) / 10))
-                    except:
+                    except (AttributeError, ValueError):
                         d = "00"
                     return d
                 d = datetime.fromtimestamp(self.rpd_file.ctime)
@@ -197,7 +207,7 @@ class NameGeneration:
 
         try:
             return d.strftime(convert_date_for_strftime(self.L2))
-        except:
+        except Exception:
             logging.error(
                 "Both file modification time and metadata date & time are invalid for "
                 "file %s",
@@ -472,6 +482,10 @@ class NameGeneration:
 
         self.rpd_file = rpd_file
 
+        # Generators can be reused across files: start from a fresh problem
+        # so one file's generation errors are not reported against the next
+        self.problem = type(self.problem)()
+
         if parts:
             name = []
         else:
@@ -612,6 +626,19 @@ class PhotoSubfolder(NameGeneration):
         self.add_extension = False
         self.L1_date_check = IMAGE_DATE  # used in _get_date_component()
 
+    def set_pref_list(self, pref_list: List[str]) -> None:
+        """
+        Change the preference list used to generate names, leaving the rest
+        of the generator's state untouched
+
+        :param pref_list: subfolder generation preferences list
+        """
+
+        if self.no_metadata:
+            self.pref_list = truncate_before_unwanted_subfolder_component(pref_list)
+        else:
+            self.pref_list = pref_list
+
     def _filter_name(self, name: str, parts: bool) -> str:
         if not parts:
             return self.filter_subfolder_characters(name)
@@ -1199,6 +1199,31 @@ class PrefValueKeyComboError(PrefError):
         self.msg = error
 
 
+def pref_list_requires_metadata(pref_list: List[str]) -> bool:
+    """
+    Determine whether a name or subfolder generation preference list
+    contains an element whose value must be read from a file's metadata.
+
+    Date and time values other than today, yesterday and the download time
+    come from the metadata, as does every value under the metadata element.
+
+    :param pref_list: name or subfolder generation preferences list
+    :return: True if generating names with the list reads the file's
+     metadata
+    """
+
+    for i in range(0, len(pref_list), 3):
+        if pref_list[i] == METADATA:
+            return True
+        if pref_list[i] == DATE_TIME and pref_list[i + 1] not in (
+            TODAY,
+            YESTERDAY,
+            DOWNLOAD_TIME,
+        ):
+            return True
+    return False
+
+
 def check_pref_valid(pref_defn, prefs, modulo=3) -> bool:
     """
     Checks to see if user preferences are valid according to their
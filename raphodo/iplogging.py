@@ -59,7 +59,7 @@ file_logging_format = "%(asctime)s %(levelname)s %(filename)s %(lineno)d: %(mess
 
 class ZeroMQSocketHandler(QueueHandler):
     def enqueue(self, record):
-        data = pickle.dumps(record.__dict__)
+        data = pickle.dumps(record.__dict__, pickle.HIGHEST_PROTOCOL)
         self.queue.send(data)
 
 
@@ -30,12 +30,14 @@ __copyright__ = "Copyright 2011-2021, Damon Lynch"
 import os
 from datetime import datetime
 from enum import Enum
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 import errno
+import hashlib
 import logging
 import pickle
+import shutil
 import sys
-from typing import Union, Tuple, Dict, Optional
+from typing import Union, Tuple, Dict, Optional, Set
 import sqlite3
 import locale
 
@@ -48,6 +50,7 @@ except locale.Error:
 
 import raphodo.metadata.exiftool as exiftool
 import raphodo.generatename as gn
+from raphodo.generatenameconfig import pref_list_requires_metadata
 from raphodo.prefs.preferences import DownloadsTodayTracker, Preferences
 from raphodo.constants import (
     ConflictResolution,
@@ -92,13 +95,61 @@ class SyncRawJpegStatus(Enum):
 
 SyncRawJpegMatch = namedtuple("SyncRawJpegMatch", "status, sequence_number")
 SyncRawJpegResult = namedtuple(
-    "SyncRawJpegResult", "sequence_to_use, failed, photo_name, " "photo_ext"
-)
-SyncRawJpegRecord = namedtuple(
-    "SyncRawJpegRecord", "extension, date_time, sequence_number_used"
+    "SyncRawJpegResult", "sequence_to_use, failed, photo_name, photo_ext, fingerprint"
 )
 
 
+def file_head_fingerprint(path: str, length: int = 262144) -> Optional[bytes]:
+    """
+    Fingerprint a file by hashing its first 256 KB.
+
+    Photos that genuinely differ diverge within the first few KB of
+    image data, so hashing only the head gives the same practical
+    collision behavior as hashing the entire file, while reading a
+    bounded amount of a potentially enormous RAW or video.
+
+    :param path: full path of the file to hash
+    :return: the digest, or None if the file could not be read
+    """
+
+    try:
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(length)).digest()
+    except OSError:
+        return None
+
+
+class SyncRawJpegRecord:
+    """
+    Tracking data for a photo name that has already been downloaded, used
+    when matching RAW + JPEG pairs.
+
+    Slots are used in preference to a per-instance dict because a large
+    download accumulates one record per photo.
+    """
+
+    __slots__ = (
+        "first_extension",
+        "extensions",
+        "fingerprints",
+        "date_time",
+        "sequence_number_used",
+    )
+
+    def __init__(
+        self,
+        extension: str,
+        date_time: datetime,
+        sequence_number_used: "gn.MatchedSequences",
+        fingerprint: Optional[bytes] = None,
+    ) -> None:
+        self.first_extension = extension
+        self.extensions = {extension}  # type: Set[str]
+        self.fingerprints = {extension: fingerprint}  # type: Dict[str, Optional[bytes]]
+        self.date_time = date_time
+        self.sequence_number_used = sequence_number_used
+
+
 class SyncRawJpeg:
     """
     Match JPEG and RAW images so they have the same file names
@@ -113,6 +164,7 @@ class SyncRawJpeg:
         extension: str,
         date_time: datetime,
         sequence_number_used: gn.MatchedSequences,
+        fingerprint: Optional[bytes] = None,
     ) -> None:
 
         if not isinstance(date_time, datetime):
@@ -123,18 +175,24 @@ class SyncRawJpeg:
             )
             return
 
-        if name not in self.photos:
+        record = self.photos.get(name)
+        if record is None:
             self.photos[name] = SyncRawJpegRecord(
-                extension=[extension],
+                extension=extension,
                 date_time=date_time,
                 sequence_number_used=sequence_number_used,
+                fingerprint=fingerprint,
             )
         else:
-            if extension not in self.photos[name].extension:
-                self.photos[name].extension.append(extension)
+            record.extensions.add(extension)
+            record.fingerprints[extension] = fingerprint
 
     def matching_pair(
-        self, name: str, extension: str, date_time: datetime
+        self,
+        name: str,
+        extension: str,
+        date_time: datetime,
+        fingerprint: Optional[bytes] = None,
     ) -> SyncRawJpegMatch:
         """
         Checks to see if the image matches an image that has already been
@@ -145,6 +203,12 @@ class SyncRawJpeg:
         need to allow for the fact that RAW and jpegs might not be
         written to the memory card(s) at the same time.
 
+        If content fingerprints are available for both this file and the
+        already downloaded file with the same extension, differing
+        fingerprints mean the files merely share a name, e.g. two
+        cameras with coinciding filename numbering, and no match is
+        reported.
+
         :return: Returns SyncRawJpegStatus.error_already_downloaded
          and a sequence number if the name, extension, and exif values
          match (i.e. it has already been downloaded).
@@ -161,17 +225,30 @@ class SyncRawJpeg:
          of None if no match
         """
 
-        if name in self.photos:
-            if datetime_roughly_equal(self.photos[name].date_time, date_time, 30):
-                if extension in self.photos[name].extension:
+        record = self.photos.get(name)
+        if record is not None:
+            if datetime_roughly_equal(record.date_time, date_time, 30):
+                if extension in record.extensions:
+                    known_fingerprint = record.fingerprints.get(extension)
+                    if (
+                        fingerprint is not None
+                        and known_fingerprint is not None
+                        and fingerprint != known_fingerprint
+                    ):
+                        # Same name, same extension, and exif date times
+                        # within 30 seconds, but the file contents differ:
+                        # two cameras produced coincidentally matching
+                        # names. Download the file, leaving any filename
+                        # collision to the usual conflict resolution.
+                        return SyncRawJpegMatch(SyncRawJpegStatus.no_match, None)
                     return SyncRawJpegMatch(
                         SyncRawJpegStatus.error_already_downloaded,
-                        self.photos[name].sequence_number_used,
+                        record.sequence_number_used,
                     )
                 else:
                     return SyncRawJpegMatch(
                         SyncRawJpegStatus.matching_pair,
-                        self.photos[name].sequence_number_used,
+                        record.sequence_number_used,
                     )
             else:
                 return SyncRawJpegMatch(SyncRawJpegStatus.error_datetime_mismatch, None)
@@ -183,7 +260,78 @@ class SyncRawJpeg:
         the already downloaded photo
         """
 
-        return self.photos[name].extension[0], self.photos[name].date_time
+        record = self.photos[name]
+        return record.first_extension, record.date_time
+
+
+def stat_or_none(path: str) -> Optional[os.stat_result]:
+    """
+    Stat a file, returning None instead of raising if it does not exist.
+
+    Lets callers test for existence and reuse the stat result, instead of
+    issuing separate os.path.exists / os.path.getmtime calls on the same
+    path.
+
+    :param path: full path of the file to stat
+    :return: the stat result, or None if the file does not exist
+    """
+
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def rename_no_clobber(src: str, dst: str) -> None:
+    """
+    Move (rename) src to dst, raising OSError with errno EEXIST if dst
+    already exists.
+
+    os.rename silently replaces an existing target on POSIX, so checking
+    for an existing file and renaming in two steps leaves a window in
+    which another writer can create the target. Instead link the file
+    into place -- os.link fails atomically with EEXIST -- and then
+    remove the source. Filesystems without hard link support -- e.g. FAT,
+    or FUSE mounts of exFAT / NTFS, common on removable media -- fall
+    back to the non-atomic check-then-rename.
+
+    :param src: full path of the file to move
+    :param dst: full path to move it to
+    """
+
+    try:
+        os.link(src, dst)
+    except OSError as inst:
+        if inst.errno == errno.EXDEV:
+            # The destination is on another filesystem, e.g. the generated
+            # subfolder traversed a symlink to a different volume, so a
+            # rename is impossible and the file must be copied. shutil
+            # uses the kernel's zero-copy paths where they are available.
+            if os.path.lexists(dst):
+                raise OSError(errno.EEXIST, "File exists: %s" % dst)
+            shutil.move(src, dst)
+            return
+        if inst.errno in (errno.EPERM, errno.EOPNOTSUPP, errno.ENOSYS, errno.EMLINK):
+            if os.path.lexists(dst):
+                raise OSError(errno.EEXIST, "File exists: %s" % dst)
+            os.rename(src, dst)
+            return
+        raise
+    else:
+        os.unlink(src)
+
+
+def date_time_strings(dt: datetime) -> Tuple[str, str]:
+    """
+    Format a date time's date and time in the locale's representation,
+    parsing the format string once instead of once per component.
+
+    :param dt: value to format
+    :return: date and time strings
+    """
+
+    date, time = dt.strftime("%x\t%X").split("\t", 1)
+    return date, time
 
 
 def load_metadata(
@@ -200,6 +348,10 @@ def load_metadata(
     :return True if operation succeeded, false otherwise
     """
     if rpd_file.metadata is None:
+        if rpd_file.metadata_failure:
+            # An earlier attempt to read the metadata failed and has already
+            # been reported: don't prod exiftool with the same file again
+            return False
         if not rpd_file.load_metadata(
             full_file_name=rpd_file.temp_full_file_name, et_process=et_process
         ):
@@ -219,6 +371,7 @@ def _generate_name(
     rpd_file: Union[Photo, Video],
     et_process: exiftool.ExifTool,
     problems: RenamingProblems,
+    requires_metadata: bool = True,
 ) -> str:
     """
     Generate a subfolder or file name.
@@ -227,9 +380,14 @@ def _generate_name(
      for the file type (photo or video)
     :param rpd_file: file to work on
     :param et_process:  the daemon ExifTool process
+    :param requires_metadata: False if no element of the pref list reads
+     the file's metadata, making loading it unnecessary
     :return: the name in string format, emptry string if error
     """
-    do_generation = load_metadata(rpd_file, et_process, problems)
+    if requires_metadata:
+        do_generation = load_metadata(rpd_file, et_process, problems)
+    else:
+        do_generation = True
 
     if do_generation:
         value = generator.generate_name(rpd_file)
@@ -243,46 +401,48 @@ def _generate_name(
 
 def generate_subfolder(
     rpd_file: Union[Photo, Video],
+    generator: Union[gn.PhotoSubfolder, gn.VideoSubfolder],
     et_process: exiftool.ExifTool,
     problems: RenamingProblems,
+    requires_metadata: bool = True,
 ) -> None:
     """
     Generate subfolder names e.g. 2015/201512
 
     :param rpd_file: file to work on
+    :param generator: subfolder name generator for the file's type
     :param et_process:  the daemon ExifTool process
     :param problems: problems encountered renaming the file
+    :param requires_metadata: False if no element of the pref list reads
+     the file's metadata
     """
 
-    if rpd_file.file_type == FileType.photo:
-        generator = gn.PhotoSubfolder(rpd_file.subfolder_pref_list, problems=problems)
-    else:
-        generator = gn.VideoSubfolder(rpd_file.subfolder_pref_list, problems=problems)
-
     rpd_file.download_subfolder = _generate_name(
-        generator, rpd_file, et_process, problems
+        generator, rpd_file, et_process, problems, requires_metadata
     )
 
 
 def generate_name(
     rpd_file: Union[Photo, Video],
+    generator: Union[gn.PhotoName, gn.VideoName],
     et_process: exiftool.ExifTool,
     problems: RenamingProblems,
+    requires_metadata: bool = True,
 ) -> None:
     """
     Generate file names e.g. 20150607-1.cr2
 
     :param rpd_file: file to work on
+    :param generator: file name generator for the file's type
     :param et_process:  the daemon ExifTool process
     :param problems: problems encountered renaming the file
+    :param requires_metadata: False if no element of the pref list reads
+     the file's metadata
     """
 
-    if rpd_file.file_type == FileType.photo:
-        generator = gn.PhotoName(pref_list=rpd_file.name_pref_list, problems=problems)
-    else:
-        generator = gn.VideoName(pref_list=rpd_file.name_pref_list, problems=problems)
-
-    rpd_file.download_name = _generate_name(generator, rpd_file, et_process, problems)
+    rpd_file.download_name = _generate_name(
+        generator, rpd_file, et_process, problems, requires_metadata
+    )
 
 
 class RenameMoveFileWorker(DaemonProcess):
@@ -300,6 +460,29 @@ class RenameMoveFileWorker(DaemonProcess):
         self.sync_raw_jpeg = SyncRawJpeg()
         self.downloaded = DownloadedSQL()
 
+        # Downloaded file records awaiting insertion into the SQLite
+        # database, and how many to accumulate before they are committed
+        # in one transaction
+        self.pending_downloaded = []  # type: list
+        self.downloaded_batch_size = 128
+
+        # Name and subfolder generators, constructed once per download
+        # rather than once per file
+        self.generator_cache = {}  # type: dict
+
+        # Whether each file type's pref lists read the file's metadata,
+        # determined once per download
+        self.metadata_required_cache = {}  # type: Dict[FileType, bool]
+
+        # Download subfolders already created or found during this
+        # download: most files in a download land in a handful of
+        # subfolders, so check the file system only once per subfolder
+        self.known_download_paths = set()  # type: Set[str]
+
+        # href used when reporting problems against a file's device:
+        # identical for every file from the same device, so build it once
+        self.device_href_cache = {}  # type: Dict[Tuple[str, str], str]
+
         logging.debug("Start of day is set to %s", self.prefs.day_start)
 
         self.platform_c_maxint = platform_c_maxint()
@@ -308,20 +491,46 @@ class RenameMoveFileWorker(DaemonProcess):
         # clarifies any problems with type checking in an IDE
         self.problems = RenamingProblems()
 
+    def device_href(self, rpd_file: Union[Photo, Video]) -> str:
+        """
+        Return the href used when reporting a problem against a file's
+        device, building it once per device rather than once per problem
+
+        :param rpd_file: file the problem concerns
+        :return: the href
+        """
+
+        key = (rpd_file.device_display_name, rpd_file.device_uri)
+        href = self.device_href_cache.get(key)
+        if href is None:
+            href = make_href(name=rpd_file.device_display_name, uri=rpd_file.device_uri)
+            self.device_href_cache[key] = href
+        return href
+
     def notify_file_already_exists(
-        self, rpd_file: Union[Photo, Video], identifier: Optional[str] = None
+        self,
+        rpd_file: Union[Photo, Video],
+        identifier: Optional[str] = None,
+        existing_stat: Optional[os.stat_result] = None,
     ) -> None:
         """
         Notify user that the download file already exists
+
+        :param rpd_file: file being downloaded
+        :param identifier: identifier appended to the file name, if any
+        :param existing_stat: stat result for the existing file, if the
+         caller already has one, saving a repeat stat of the same path
         """
 
         # get information on when the existing file was last modified
         try:
-            modification_time = os.path.getmtime(rpd_file.download_full_file_name)
+            if existing_stat is not None:
+                modification_time = existing_stat.st_mtime
+            else:
+                modification_time = os.path.getmtime(rpd_file.download_full_file_name)
             dt = datetime.fromtimestamp(modification_time)
-            date = dt.strftime("%x")
-            time = dt.strftime("%X")
-        except Exception:
+            date, time = date_time_strings(dt)
+        except (OSError, OverflowError, ValueError):
             logging.error(
                 "Could not determine the file modification time of %s",
                 rpd_file.download_full_file_name,
@@ -330,7 +539,7 @@ class RenameMoveFileWorker(DaemonProcess):
 
         source = rpd_file.get_souce_href()
 
-        device = make_href(name=rpd_file.device_display_name, uri=rpd_file.device_uri)
+        device = self.device_href(rpd_file)
 
         if not identifier:
             problem = FileAlreadyExistsProblem(
@@ -372,7 +581,7 @@ class RenameMoveFileWorker(DaemonProcess):
             full_file_name=rpd_file.full_file_name,
             camera_details=rpd_file.camera_details,
         )
-        device = make_href(name=rpd_file.device_display_name, uri=rpd_file.device_uri)
+        device = self.device_href(rpd_file)
 
         problem = RenamingFileProblem(
             file_type=rpd_file.title,
@@ -399,19 +608,27 @@ class RenameMoveFileWorker(DaemonProcess):
                 str(inst),
             )
 
-    def download_file_exists(self, rpd_file: Union[Photo, Video]) -> bool:
+    def download_file_exists(
+        self,
+        rpd_file: Union[Photo, Video],
+        existing_stat: Optional[os.stat_result] = None,
+    ) -> bool:
         """
         Check how to handle a download file already existing
+
+        :param rpd_file: file being downloaded
+        :param existing_stat: stat result for the existing file, if the
+         caller already has one
         """
 
-        if self.prefs.conflict_resolution == ConflictResolution.add_identifier:
+        if self.add_identifier_on_conflict:
             logging.debug(
                 "Will add unique identifier to avoid duplicate filename for %s",
                 rpd_file.full_file_name,
             )
             return True
         else:
-            self.notify_file_already_exists(rpd_file)
+            self.notify_file_already_exists(rpd_file, existing_stat=existing_stat)
             return False
 
     def same_name_different_exif(
@@ -425,11 +642,9 @@ class RenameMoveFileWorker(DaemonProcess):
         i1_ext, i1_date_time = self.sync_raw_jpeg.ext_exif_date_time(sync_photo_name)
         image2_date_time = rpd_file.date_time()
         assert isinstance(i1_date_time, datetime)
-        i1_date = i1_date_time.strftime("%x")
-        i1_time = i1_date_time.strftime("%X")
+        i1_date, i1_time = date_time_strings(i1_date_time)
         assert isinstance(image2_date_time, datetime)
-        image2_date = image2_date_time.strftime("%x")
-        image2_time = image2_date_time.strftime("%X")
+        image2_date, image2_time = date_time_strings(image2_date_time)
 
         self.problems.append(
             SameNameDifferentExif(
@@ -462,42 +677,72 @@ class RenameMoveFileWorker(DaemonProcess):
 
         return download_full_name
 
-    def move_thm_file(self, rpd_file: Union[Photo, Video]) -> None:
+    def _move_associate(
+        self,
+        rpd_file: Union[Photo, Video],
+        extension_attribute: str,
+        fallback_extension: str,
+        temp_attribute: str,
+        download_attribute: str,
+        description: str,
+    ) -> None:
         """
-        Move (rename) the THM thumbnail file using the pre-generated name
+        Move (rename) an associate file -- THM thumbnail, audio, XMP or
+        LOG -- using the pre-generated name, reporting any problem.
+
+        :param rpd_file: file being worked on
+        :param extension_attribute: rpd_file attribute holding the
+         generated extension, if any
+        :param fallback_extension: extension to use when none was generated
+        :param temp_attribute: rpd_file attribute holding the temporary
+         associate file's full name
+        :param download_attribute: rpd_file attribute to which the moved
+         file's full name is assigned
+        :param description: what kind of associate file it is, for the
+         error log
         """
 
-        try:
-            if rpd_file.thm_extension:
-                ext = rpd_file.thm_extension
-            else:
-                ext = ".THM"
-        except AttributeError:
-            ext = ".THM"
+        ext = getattr(rpd_file, extension_attribute, None) or fallback_extension
 
         try:
-            rpd_file.download_thm_full_name = self._move_associate_file(
-                extension=ext,
-                full_base_name=rpd_file.download_full_base_name,
-                temp_associate_file=rpd_file.temp_thm_full_name,
+            setattr(
+                rpd_file,
+                download_attribute,
+                self._move_associate_file(
+                    extension=ext,
+                    full_base_name=rpd_file.download_full_base_name,
+                    temp_associate_file=getattr(rpd_file, temp_attribute),
+                ),
             )
         except (OSError, FileNotFoundError) as e:
+            download_full_name = getattr(rpd_file, download_attribute)
             self.problems.append(
                 RenamingAssociateFileProblem(
                     source=make_href(
-                        name=os.path.basename(rpd_file.download_thm_full_name),
+                        name=os.path.basename(download_full_name),
                         uri=get_uri(
-                            full_file_name=rpd_file.download_thm_full_name,
+                            full_file_name=download_full_name,
                             camera_details=rpd_file.camera_details,
                         ),
                     ),
                     exception=e,
                 )
             )
+            logging.error("Failed to move %s %s", description, download_full_name)
 
-            logging.error(
-                "Failed to move video THM file %s", rpd_file.download_thm_full_name
-            )
+    def move_thm_file(self, rpd_file: Union[Photo, Video]) -> None:
+        """
+        Move (rename) the THM thumbnail file using the pre-generated name
+        """
+
+        self._move_associate(
+            rpd_file,
+            extension_attribute="thm_extension",
+            fallback_extension=".THM",
+            temp_attribute="temp_thm_full_name",
+            download_attribute="download_thm_full_name",
+            description="video THM file",
+        )
 
     def move_audio_file(self, rpd_file: Union[Photo, Video]) -> None:
         """
@@ -505,37 +750,14 @@ class RenameMoveFileWorker(DaemonProcess):
         name
         """
 
-        try:
-            if rpd_file.audio_extension:
-                ext = rpd_file.audio_extension
-            else:
-                ext = ".WAV"
-        except AttributeError:
-            ext = ".WAV"
-
-        try:
-            rpd_file.download_audio_full_name = self._move_associate_file(
-                extension=ext,
-                full_base_name=rpd_file.download_full_base_name,
-                temp_associate_file=rpd_file.temp_audio_full_name,
-            )
-        except (OSError, FileNotFoundError) as e:
-            self.problems.append(
-                RenamingAssociateFileProblem(
-                    source=make_href(
-                        name=os.path.basename(rpd_file.download_audio_full_name),
-                        uri=get_uri(
-                            full_file_name=rpd_file.download_audio_full_name,
-                            camera_details=rpd_file.camera_details,
-                        ),
-                    ),
-                    exception=e,
-                )
-            )
-            logging.error(
-                "Failed to move file's associated audio file %s",
-                rpd_file.download_audio_full_name,
-            )
+        self._move_associate(
+            rpd_file,
+            extension_attribute="audio_extension",
+            fallback_extension=".WAV",
+            temp_attribute="temp_audio_full_name",
+            download_attribute="download_audio_full_name",
+            description="file's associated audio file",
+        )
 
     def move_xmp_file(self, rpd_file: Union[Photo, Video]) -> None:
         """
@@ -543,75 +765,29 @@ class RenameMoveFileWorker(DaemonProcess):
         name
         """
 
-        try:
-            if rpd_file.xmp_extension:
-                ext = rpd_file.xmp_extension
-            else:
-                ext = ".XMP"
-        except AttributeError:
-            ext = ".XMP"
-
-        try:
-            rpd_file.download_xmp_full_name = self._move_associate_file(
-                extension=ext,
-                full_base_name=rpd_file.download_full_base_name,
-                temp_associate_file=rpd_file.temp_xmp_full_name,
-            )
-        except (OSError, FileNotFoundError) as e:
-            self.problems.append(
-                RenamingAssociateFileProblem(
-                    source=make_href(
-                        name=os.path.basename(rpd_file.download_xmp_full_name),
-                        uri=get_uri(
-                            full_file_name=rpd_file.download_xmp_full_name,
-                            camera_details=rpd_file.camera_details,
-                        ),
-                    ),
-                    exception=e,
-                )
-            )
-            logging.error(
-                "Failed to move file's associated XMP file %s",
-                rpd_file.download_xmp_full_name,
-            )
+        self._move_associate(
+            rpd_file,
+            extension_attribute="xmp_extension",
+            fallback_extension=".XMP",
+            temp_attribute="temp_xmp_full_name",
+            download_attribute="download_xmp_full_name",
+            description="file's associated XMP file",
+        )
 
     def move_log_file(self, rpd_file: Union[Photo, Video]) -> None:
         """
-        Move (rename) the associate XMP file using the pre-generated
+        Move (rename) the associate LOG file using the pre-generated
         name
         """
 
-        try:
-            if rpd_file.log_extension:
-                ext = rpd_file.log_extension
-            else:
-                ext = ".LOG"
-        except AttributeError:
-            ext = ".LOG"
-
-        try:
-            rpd_file.download_log_full_name = self._move_associate_file(
-                extension=ext,
-                full_base_name=rpd_file.download_full_base_name,
-                temp_associate_file=rpd_file.temp_log_full_name,
-            )
-        except (OSError, FileNotFoundError) as e:
-            self.problems.append(
-                RenamingAssociateFileProblem(
-                    source=make_href(
-                        name=os.path.basename(rpd_file.download_log_full_name),
-                        uri=get_uri(
-                            full_file_name=rpd_file.download_log_full_name,
-                            camera_details=rpd_file.camera_details,
-                        ),
-                    ),
-                    exception=e,
-                )
-            )
-            logging.error(
-                "Failed to move file's associated LOG file %s",
-                rpd_file.download_log_full_name,
-            )
+        self._move_associate(
+            rpd_file,
+            extension_attribute="log_extension",
+            fallback_extension=".LOG",
+            temp_attribute="temp_log_full_name",
+            download_attribute="download_log_full_name",
+            description="file's associated LOG file",
+        )
 
     def check_for_fatal_name_generation_errors(
         self, rpd_file: Union[Photo, Video]
@@ -654,21 +830,31 @@ class RenameMoveFileWorker(DaemonProcess):
 
         name = os.path.splitext(rpd_file.download_name)
         full_name = rpd_file.download_full_file_name
+
+        # List the download directory once and test each candidate name
+        # against it, instead of issuing a stat syscall per candidate: with
+        # many same-named files the per-candidate stats become quadratic
+        try:
+            existing_names = {
+                entry.name for entry in os.scandir(rpd_file.download_path)
+            }
+        except OSError as inst:
+            self.notify_download_failure_file_error(rpd_file, inst)
+            return False
+
         while True:
-            self.duplicate_files[full_name] = self.duplicate_files.get(full_name, 0) + 1
+            self.duplicate_files[full_name] += 1
             identifier = "_%s" % self.duplicate_files[full_name]
             rpd_file.download_name = "{}{}{}".format(name[0], identifier, name[1])
             rpd_file.download_full_file_name = os.path.join(
                 rpd_file.download_path, rpd_file.download_name
             )
 
+            if rpd_file.download_name in existing_names:
+                continue
+
             try:
-                if os.path.exists(rpd_file.download_full_file_name):
-                    raise OSError(
-                        errno.EEXIST,
-                        "File exists: %s" % rpd_file.download_full_file_name,
-                    )
-                os.rename(
+                rename_no_clobber(
                     rpd_file.temp_full_file_name, rpd_file.download_full_file_name
                 )
                 self.notify_file_already_exists(rpd_file, identifier)
@@ -683,6 +869,7 @@ class RenameMoveFileWorker(DaemonProcess):
 
         failed = False
         sequence_to_use = None
+        fingerprint = None
         photo_name, photo_ext = os.path.splitext(rpd_file.name)
         if not load_metadata(rpd_file, self.exiftool_process, self.problems):
             failed = True
@@ -695,18 +882,19 @@ class RenameMoveFileWorker(DaemonProcess):
                 rpd_file.status = DownloadStatus.download_failed
                 self.check_for_fatal_name_generation_errors(rpd_file)
             else:
+                fingerprint = file_head_fingerprint(rpd_file.temp_full_file_name)
                 matching_pair = self.sync_raw_jpeg.matching_pair(
-                    name=photo_name, extension=photo_ext, date_time=date_time
+                    name=photo_name,
+                    extension=photo_ext,
+                    date_time=date_time,
+                    fingerprint=fingerprint,
                 )  # type: SyncRawJpegMatch
                 sequence_to_use = matching_pair.sequence_number
                 if matching_pair.status == SyncRawJpegStatus.error_already_downloaded:
                     # this exact file has already been
                     # downloaded (same extension, same filename,
                     # and roughly the same exif date time  info)
-                    if (
-                        self.prefs.conflict_resolution
-                        != ConflictResolution.add_identifier
-                    ):
+                    if not self.add_identifier_on_conflict:
                         self.problems.append(
                             DuplicateFileWhenSyncingProblem(
                                 name=rpd_file.name,
@@ -728,7 +916,9 @@ class RenameMoveFileWorker(DaemonProcess):
                     ):
                         self.same_name_different_exif(photo_name, rpd_file)
 
-        return SyncRawJpegResult(sequence_to_use, failed, photo_name, photo_ext)
+        return SyncRawJpegResult(
+            sequence_to_use, failed, photo_name, photo_ext, fingerprint
+        )
 
     def prepare_rpd_file(self, rpd_file: Union[Photo, Video]) -> None:
         """
@@ -737,13 +927,35 @@ class RenameMoveFileWorker(DaemonProcess):
         """
 
         if rpd_file.file_type == FileType.photo:
-            rpd_file.download_folder = self.prefs.photo_download_folder
-            rpd_file.subfolder_pref_list = self.prefs.photo_subfolder
-            rpd_file.name_pref_list = self.prefs.photo_rename
+            rpd_file.download_folder = self.photo_download_folder
+            rpd_file.subfolder_pref_list = self.photo_subfolder_pref_list
+            rpd_file.name_pref_list = self.photo_name_pref_list
         else:
-            rpd_file.download_folder = self.prefs.video_download_folder
-            rpd_file.subfolder_pref_list = self.prefs.video_subfolder
-            rpd_file.name_pref_list = self.prefs.video_rename
+            rpd_file.download_folder = self.video_download_folder
+            rpd_file.subfolder_pref_list = self.video_subfolder_pref_list
+            rpd_file.name_pref_list = self.video_name_pref_list
+
+    def flush_downloaded_files(self) -> None:
+        """
+        Write any accumulated downloaded file records to the SQLite
+        database, committing them in a single transaction
+        """
+
+        if not self.pending_downloaded:
+            return
+
+        try:
+            self.downloaded.add_downloaded_files(self.pending_downloaded)
+        except sqlite3.OperationalError as e:
+            # This should never happen because this is the only
+            # process writing to the database..... but just in
+            # case
+            logging.error(
+                "Database error adding %s download files: %s. Will not retry.",
+                len(self.pending_downloaded),
+                e,
+            )
+        self.pending_downloaded = []
 
     def process_rename_failure(self, rpd_file: RPDFile) -> None:
         try:
@@ -753,20 +965,85 @@ class RenameMoveFileWorker(DaemonProcess):
                 "Failed to delete temporary file %s", rpd_file.temp_full_file_name
             )
 
+    def get_generator(
+        self, rpd_file: Union[Photo, Video], subfolder: bool
+    ) -> Union[gn.PhotoName, gn.PhotoSubfolder, gn.VideoName, gn.VideoSubfolder]:
+        """
+        Return the name or subfolder generator for the file's type,
+        constructing it on first use.
+
+        The preference lists are the same for every file in a download, so
+        each generator is built once per download instead of once per
+        file. The cache is emptied when a new download starts, because the
+        generators reference that download's problems instance.
+
+        :param rpd_file: file whose name or subfolder is being generated
+        :param subfolder: True if generating a subfolder name, False if
+         generating a file name
+        :return: the generator
+        """
+
+        if rpd_file.file_type == FileType.photo:
+            generator_class = gn.PhotoSubfolder if subfolder else gn.PhotoName
+        else:
+            generator_class = gn.VideoSubfolder if subfolder else gn.VideoName
+
+        if subfolder:
+            pref_list = rpd_file.subfolder_pref_list
+        else:
+            pref_list = rpd_file.name_pref_list
+
+        generator = self.generator_cache.get(generator_class)
+        if generator is None:
+            generator = generator_class(pref_list, problems=self.problems)
+            self.generator_cache[generator_class] = generator
+        else:
+            generator.set_pref_list(pref_list)
+        return generator
+
+    def file_metadata_required(self, rpd_file: Union[Photo, Video]) -> bool:
+        """
+        Determine whether generating this file's subfolder and name reads
+        its metadata, computing the answer once per file type per download.
+
+        Date-only or fixed naming schemes need nothing beyond the file's
+        modification time, letting renaming skip exiftool entirely.
+
+        :param rpd_file: file whose names will be generated
+        :return: True if the pref lists read the file's metadata
+        """
+
+        required = self.metadata_required_cache.get(rpd_file.file_type)
+        if required is None:
+            required = pref_list_requires_metadata(
+                rpd_file.subfolder_pref_list
+            ) or pref_list_requires_metadata(rpd_file.name_pref_list)
+            self.metadata_required_cache[rpd_file.file_type] = required
+        return required
+
     def generate_names(
         self, rpd_file: Union[Photo, Video], synchronize_raw_jpg: bool
     ) -> bool:
 
-        rpd_file.strip_characters = self.prefs.strip_characters
+        rpd_file.strip_characters = self.strip_characters
+
+        requires_metadata = self.file_metadata_required(rpd_file)
 
-        generate_subfolder(rpd_file, self.exiftool_process, self.problems)
+        generate_subfolder(
+            rpd_file,
+            self.get_generator(rpd_file, subfolder=True),
+            self.exiftool_process,
+            self.problems,
+            requires_metadata,
+        )
 
         if rpd_file.download_subfolder:
-            logging.debug(
-                "Generated subfolder name %s for file %s",
-                rpd_file.download_subfolder,
-                rpd_file.name,
-            )
+            if self.debug_logging:
+                logging.debug(
+                    "Generated subfolder name %s for file %s",
+                    rpd_file.download_subfolder,
+                    rpd_file.name,
+                )
 
             self.sequences.stored_sequence_no = self.prefs.stored_sequence_no
             if self.must_synchronize_raw_jpg and rpd_file.file_type == FileType.video:
@@ -775,7 +1052,13 @@ class RenameMoveFileWorker(DaemonProcess):
             rpd_file.sequences = self.sequences
 
             # generate the file name
-            generate_name(rpd_file, self.exiftool_process, self.problems)
+            generate_name(
+                rpd_file,
+                self.get_generator(rpd_file, subfolder=False),
+                self.exiftool_process,
+                self.problems,
+                requires_metadata,
+            )
 
             if rpd_file.name_generation_problem:
                 logging.warning(
@@ -783,7 +1066,7 @@ class RenameMoveFileWorker(DaemonProcess):
                     rpd_file.name,
                 )
                 rpd_file.status = DownloadStatus.downloaded_with_warning
-            else:
+            elif self.debug_logging:
                 logging.debug(
                     "Generated file name %s for file %s",
                     rpd_file.download_name,
@@ -812,51 +1095,61 @@ class RenameMoveFileWorker(DaemonProcess):
         rpd_file.download_full_file_name = os.path.join(
             rpd_file.download_path, rpd_file.download_name
         )
-        rpd_file.download_full_base_name = os.path.splitext(
-            rpd_file.download_full_file_name
-        )[0]
+        # Split the extension off the short file name rather than scanning
+        # the full path for it
+        rpd_file.download_full_base_name = os.path.join(
+            rpd_file.download_path, os.path.splitext(rpd_file.download_name)[0]
+        )
 
-        if not os.path.isdir(rpd_file.download_path):
+        # Create the download subfolder if need be, without a separate
+        # directory existence check: makedirs itself reports whether the
+        # directory was already there. Once a subfolder is known to exist,
+        # skip even that for the rest of the download.
+        if rpd_file.download_path not in self.known_download_paths:
             try:
-                os.makedirs(rpd_file.download_path)
+                os.makedirs(rpd_file.download_path, exist_ok=True)
             except OSError as inst:
-                if inst.errno != errno.EEXIST:
-                    logging.error(
-                        "Failed to create download subfolder: %s",
-                        rpd_file.download_path,
-                    )
-                    logging.error(inst)
+                logging.error(
+                    "Failed to create download subfolder: %s",
+                    rpd_file.download_path,
+                )
+                logging.error(inst)
 
-                    problem = SubfolderCreationProblem(
-                        folder=make_href(
-                            name=rpd_file.download_subfolder,
-                            uri=get_uri(path=rpd_file.download_path),
-                        ),
-                        exception=inst,
-                    )
-                    self.problems.append(problem)
+                problem = SubfolderCreationProblem(
+                    folder=make_href(
+                        name=rpd_file.download_subfolder,
+                        uri=get_uri(path=rpd_file.download_path),
+                    ),
+                    exception=inst,
+                )
+                self.problems.append(problem)
+            else:
+                self.known_download_paths.add(rpd_file.download_path)
 
         # Move temp file to subfolder
 
         add_unique_identifier = False
         try:
-            if os.path.exists(rpd_file.download_full_file_name):
-                raise OSError(
-                    errno.EEXIST, "File exists: %s" % rpd_file.download_full_file_name
+            if self.debug_logging:
+                logging.debug(
+                    "Renaming %s to %s .....",
+                    rpd_file.temp_full_file_name,
+                    rpd_file.download_full_file_name,
                 )
-            logging.debug(
-                "Renaming %s to %s .....",
-                rpd_file.temp_full_file_name,
-                rpd_file.download_full_file_name,
+            rename_no_clobber(
+                rpd_file.temp_full_file_name, rpd_file.download_full_file_name
             )
-            os.rename(rpd_file.temp_full_file_name, rpd_file.download_full_file_name)
-            logging.debug("....successfully renamed file")
+            if self.debug_logging:
+                logging.debug("....successfully renamed file")
             move_succeeded = True
             if rpd_file.status != DownloadStatus.downloaded_with_warning:
                 rpd_file.status = DownloadStatus.downloaded
         except OSError as inst:
             if inst.errno == errno.EEXIST:
-                add_unique_identifier = self.download_file_exists(rpd_file)
+                add_unique_identifier = self.download_file_exists(
+                    rpd_file,
+                    existing_stat=stat_or_none(rpd_file.download_full_file_name),
+                )
             else:
                 self.notify_download_failure_file_error(rpd_file, inst)
         except Exception as inst:
@@ -895,7 +1188,8 @@ class RenameMoveFileWorker(DaemonProcess):
         if generation_succeeded:
             move_succeeded = self.move_file(rpd_file)
 
-            logging.debug("Finished processing file: %s", download_count)
+            if self.debug_logging:
+                logging.debug("Finished processing file: %s", download_count)
 
         if move_succeeded:
             if synchronize_raw_jpg:
@@ -908,6 +1202,7 @@ class RenameMoveFileWorker(DaemonProcess):
                     extension=sync_result.photo_ext,
                     date_time=rpd_file.date_time(),
                     sequence_number_used=sequence,
+                    fingerprint=sync_result.fingerprint,
                 )
 
             if not synchronize_raw_jpg or (
@@ -970,6 +1265,24 @@ class RenameMoveFileWorker(DaemonProcess):
         self.uses_sequence_letter = self.prefs.any_pref_uses_sequence_letter_value()
         self.uses_stored_sequence_no = self.prefs.any_pref_uses_stored_sequence_no()
 
+    def initialise_rename_preferences(self) -> None:
+        """
+        Snapshot preference values needed for every file into plain
+        instance attributes, so the per-file code does not repeatedly
+        query the QSettings-backed preferences
+        """
+
+        self.add_identifier_on_conflict = (
+            self.prefs.conflict_resolution == ConflictResolution.add_identifier
+        )
+        self.strip_characters = self.prefs.strip_characters
+        self.photo_download_folder = self.prefs.photo_download_folder
+        self.photo_subfolder_pref_list = self.prefs.photo_subfolder
+        self.photo_name_pref_list = self.prefs.photo_rename
+        self.video_download_folder = self.prefs.video_download_folder
+        self.video_subfolder_pref_list = self.prefs.video_subfolder
+        self.video_name_pref_list = self.prefs.video_rename
+
     def run(self) -> None:
         """
         Generate subfolder and filename, and attempt to move the file
@@ -983,9 +1296,13 @@ class RenameMoveFileWorker(DaemonProcess):
         """
         i = 0
 
+        # The logging level is fixed for the process's lifetime: check it
+        # once instead of paying for disabled debug calls on every file
+        self.debug_logging = logging.getLogger().isEnabledFor(logging.DEBUG)
+
         # Dict of filename keys and int values used to track ints to add as
         # suffixes to duplicate files
-        self.duplicate_files = {}
+        self.duplicate_files = defaultdict(int)
 
         self.initialise_downloads_today_stored_number()
 
@@ -993,10 +1310,14 @@ class RenameMoveFileWorker(DaemonProcess):
             self.downloads_today_tracker, self.prefs.stored_sequence_no
         )
 
+        # -fast stops exiftool scanning to the end of the file for trailer
+        # information, none of which is used when generating names
         with stdchannel_redirected(sys.stderr, os.devnull):
-            with exiftool.ExifTool() as self.exiftool_process:
+            with exiftool.ExifTool(
+                common_arguments=["-fast"]
+            ) as self.exiftool_process:
                 while True:
-                    if i:
+                    if i and self.debug_logging:
                         logging.debug("Finished %s. Getting next task.", i)
 
                     # rename file and move to generated subfolder
@@ -1024,13 +1345,20 @@ class RenameMoveFileWorker(DaemonProcess):
 
                         self.initialise_sequence_number_usage()
 
+                        self.initialise_rename_preferences()
+
                         self.must_synchronize_raw_jpg = (
                             self.prefs.must_synchronize_raw_jpg()
                         )
 
                         self.problems = RenamingProblems()
+                        self.generator_cache.clear()
+                        self.metadata_required_cache.clear()
+                        # The user may have removed folders between downloads
+                        self.known_download_paths.clear()
 
                     elif data.message == RenameAndMoveStatus.download_completed:
+                        self.flush_downloaded_files()
                         if len(self.problems):
                             self.content = pickle.dumps(
                                 RenameAndMoveFileResults(problems=self.problems),
@@ -1069,24 +1397,22 @@ class RenameMoveFileWorker(DaemonProcess):
                             if not move_succeeded:
                                 self.process_rename_failure(rpd_file)
                             else:
-                                # Record file as downloaded in SQLite database
-                                try:
-                                    self.downloaded.add_downloaded_file(
-                                        name=rpd_file.name,
-                                        size=rpd_file.size,
-                                        modification_time=rpd_file.modification_time,
-                                        download_full_file_name=rpd_file.download_full_file_name,
-                                    )
-                                except sqlite3.OperationalError as e:
-                                    # This should never happen because this is the only
-                                    # process writing to the database..... but just in
-                                    # case
-                                    logging.error(
-                                        "Database error adding download file %s: %s. "
-                                        "Will not retry.",
+                                # Record file as downloaded in SQLite database.
+                                # Records are committed in batches: one fsync
+                                # per batch instead of one per file.
+                                self.pending_downloaded.append(
+                                    (
+                                        rpd_file.name,
+                                        rpd_file.size,
+                                        rpd_file.modification_time,
                                         rpd_file.download_full_file_name,
-                                        e,
                                     )
+                                )
+                                if (
+                                    len(self.pending_downloaded)
+                                    >= self.downloaded_batch_size
+                                ):
+                                    self.flush_downloaded_files()
                         else:
                             move_succeeded = False
 
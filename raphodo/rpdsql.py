@@ -839,6 +839,54 @@ class DownloadedSQL:
             conn.commit()
             conn.close()
 
+    @retry(stop=stop_after_attempt(sqlite3_retry_attempts))
+    def add_downloaded_files(
+        self, rows: List[Tuple[str, int, float, str]]
+    ) -> None:
+        """
+        Add multiple files to the database of downloaded files, committing
+        them in a single transaction.
+
+        :param rows: one (name, size, modification_time,
+         download_full_file_name) tuple per downloaded file, with values as
+         for add_downloaded_file()
+        """
+
+        conn = sqlite3.connect(self.db, timeout=sqlite3_timeout)
+
+        logging.debug("Adding %s files to downloaded files", len(rows))
+
+        download_datetime = datetime.datetime.now()
+
+        try:
+            conn.executemany(
+                r"""INSERT OR REPLACE INTO {tn} (file_name, size, mtime,
+                download_name, download_datetime) VALUES (?,?,?,?,?)""".format(
+                    tn=self.table_name
+                ),
+                [
+                    (
+                        name,
+                        size,
+                        modification_time,
+                        download_full_file_name,
+                        download_datetime,
+                    )
+                    for name, size, modification_time, download_full_file_name in rows
+                ],
+            )
+        except sqlite3.OperationalError as e:
+            logging.warning(
+                "Database error adding %s download files: %s. May retry.",
+                len(rows),
+                e,
+            )
+            conn.close()
+            raise sqlite3.OperationalError from e
+        else:
+            conn.commit()
+            conn.close()
+
     def file_downloaded(
         self,
         name: str,
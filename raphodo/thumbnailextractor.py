@@ -152,6 +152,26 @@ def qimage_to_png_buffer(image: QImage) -> QBuffer:
     return buffer
 
 
+def qimage_to_jpg_buffer(image: QImage, quality: int = 85) -> QBuffer:
+    """
+    Save the image data in JPEG format in a QBuffer, whose data can then
+    be extracted using the data() member function.
+
+    Considerably smaller and faster to encode than PNG, but lossy and
+    without alpha channel support, so suitable only for transient data
+    like thumbnails sent between processes.
+
+    :param image: the image to be converted
+    :param quality: JPEG quality setting
+    :return: the buffer
+    """
+
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "JPG", quality=quality)
+    return buffer
+
+
 def crop_160x120_thumbnail(thumbnail: QImage, vertical_space: int = 8) -> QImage:
     """
     Remove black bands from the top and bottom of thumbnail
@@ -657,7 +677,7 @@ class ThumbnailExtractor(LoadBalancerWorker):
 
             data = pickle.loads(content)  # type: ThumbnailExtractorArgument
 
-            thumbnail_256 = png_data = None
+            thumbnail_256 = thumbnail_data = None
             task = data.task
             processing = data.processing
             rpd_file = data.rpd_file
@@ -746,9 +766,31 @@ class ThumbnailExtractor(LoadBalancerWorker):
                         if thumbnail_256 is not None:
                             thumbnail = add_filmstrip(thumbnail_256)
 
-                    if thumbnail is not None:
-                        buffer = qimage_to_png_buffer(thumbnail)
-                        png_data = buffer.data()
+                    if thumbnail is not None and data.send_thumb_to_main:
+                        # Tasks that skip the resize step can deliver an image
+                        # larger than the UI displays, e.g. an embedded preview
+                        # used as is. Scale it down before encoding rather than
+                        # encoding pixels the main process will discard.
+                        if (
+                            thumbnail.width() > self.thumbnailSizeNeeded.width()
+                            or thumbnail.height() > self.thumbnailSizeNeeded.height()
+                        ):
+                            thumbnail = thumbnail.scaled(
+                                self.thumbnailSizeNeeded,
+                                Qt.KeepAspectRatio,
+                                Qt.SmoothTransformation,
+                            )
+
+                        # The thumbnail is sent to the main process only for
+                        # display, so a lossy but much smaller JPEG is
+                        # preferable to PNG -- unless the image has an alpha
+                        # channel, which JPEG cannot represent. The receivers
+                        # use QImage.fromData(), which detects the format.
+                        if thumbnail.hasAlphaChannel():
+                            buffer = qimage_to_png_buffer(thumbnail)
+                        else:
+                            buffer = qimage_to_jpg_buffer(thumbnail)
+                        thumbnail_data = buffer.data()
 
                     orientation_unknown = (
                         ExtractionProcessing.orient in processing
@@ -841,8 +883,6 @@ class ThumbnailExtractor(LoadBalancerWorker):
                 logging.exception("Traceback:")
 
             # Purge metadata, as it cannot be pickled
-            if not data.send_thumb_to_main:
-                png_data = None
             rpd_file.metadata = None
             self.sender.send_multipart(
                 [
@@ -850,7 +890,7 @@ class ThumbnailExtractor(LoadBalancerWorker):
                     b"data",
                     pickle.dumps(
                         GenerateThumbnailsResults(
-                            rpd_file=rpd_file, thumbnail_bytes=png_data
+                            rpd_file=rpd_file, thumbnail_bytes=thumbnail_data
                         ),
                         pickle.HIGHEST_PROTOCOL,
                     ),
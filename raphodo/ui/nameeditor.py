@@ -28,11 +28,14 @@ from typing import Dict, Union, Sequence
 import webbrowser
 import datetime
 import copy
+import functools
 import logging
+import re
+from bisect import bisect_left
 
 
 from PyQt5.QtWidgets import (
-    QTextEdit,
+    QPlainTextEdit,
     QApplication,
     QComboBox,
     QPushButton,
@@ -63,12 +66,11 @@ from PyQt5.QtGui import (
     QFontMetrics,
     QKeyEvent,
     QResizeEvent,
+    QTextBlockUserData,
     QStandardItem,
     QWheelEvent,
 )
-from PyQt5.QtCore import Qt, pyqtSlot, QSignalMapper, QSize, pyqtSignal
-
-from sortedcontainers import SortedList
+from PyQt5.QtCore import Qt, pyqtSlot, QSize, QTimer, pyqtSignal
 
 from raphodo.generatenameconfig import *
 import raphodo.generatename as gn
@@ -90,9 +92,47 @@ from raphodo.ui.viewutils import (
 )
 
 
-class PrefEditor(QTextEdit):
+@functools.lru_cache(maxsize=None)
+def _t(msg: str) -> str:
+    """
+    Memoized gettext lookup, for translating the pref definition strings
+    that recur every time the editor dialog is constructed
+    """
+
+    return _(msg)
+
+
+# Canonical instances shared by every parsed fragment, avoiding a fresh
+# allocation per fragment in the highlight hot path
+_SEP_TRIPLE = (SEPARATOR, "", "")
+_EMPTY_COLOR = ""
+
+# Keys suppressed by the editor
+_SUPPRESSED_KEYS = frozenset((Qt.Key_Enter, Qt.Key_Return, Qt.Key_Tab))
+
+# Navigation keys mapped to their cursor movements, without and with the
+# control key held down
+_NAV_MOVES = {
+    Qt.Key_Right: (QTextCursor.Right, QTextCursor.WordRight),
+    Qt.Key_Left: (QTextCursor.Left, QTextCursor.WordLeft),
+    Qt.Key_Up: (QTextCursor.Up, QTextCursor.Up),
+    Qt.Key_Down: (QTextCursor.Down, QTextCursor.Down),
+    Qt.Key_Home: (QTextCursor.StartOfLine, QTextCursor.StartOfBlock),
+    Qt.Key_PageUp: (QTextCursor.StartOfBlock, QTextCursor.StartOfBlock),
+    Qt.Key_End: (QTextCursor.EndOfLine, QTextCursor.EndOfBlock),
+    Qt.Key_PageDown: (QTextCursor.EndOfBlock, QTextCursor.EndOfBlock),
+}
+_NAV_KEYS = frozenset(_NAV_MOVES)
+
+
+class PrefEditor(QPlainTextEdit):
     """
     File renaming and subfolder generation preference editor
+
+    A QPlainTextEdit rather than a QTextEdit because the content is plain
+    text with foreground coloring applied by a QSyntaxHighlighter, and
+    QPlainTextEdit's line-based layout engine handles frequent edits and
+    rehighlighting far more cheaply.
     """
 
     prefListGenerated = pyqtSignal()
@@ -104,14 +144,26 @@ class PrefEditor(QTextEdit):
 
         super().__init__(parent)
         self.subfolder = subfolder
+        self._sep = os.sep
 
         self.user_pref_list = []  # type: List[str]
         self.user_pref_colors = []  # type: List[str]
 
+        # Digest of the document text and boundaries the pref list was last
+        # generated from, used to skip regeneration when nothing has changed
+        self._prev_digest = None  # type: Optional[int]
+        self._generate_pending = False
+
         self.heightMin = 0
         self.heightMax = 65000
+        # Cache the line spacing: the font does not change over the
+        # editor's lifetime, and wrapHeightToContents is a hot slot
+        self._lineSpacing = QFontMetrics(self.font()).lineSpacing()
         # Start out with about 4 lines in height:
-        self.setMinimumHeight(QFontMetrics(self.font()).lineSpacing() * 5)
+        self._minHeight = self._lineSpacing * 5
+        self.setMinimumHeight(self._minHeight)
+        # QPlainTextDocumentLayout emits this signal when blocks are added
+        # or removed and when soft wrapping changes the line count
         self.document().documentLayout().documentSizeChanged.connect(
             self.wrapHeightToContents
         )
@@ -124,11 +176,12 @@ class PrefEditor(QTextEdit):
         http://stackoverflow.com/questions/11851020/a-qwidget-like-qtextedit-that-wraps-its-height-automatically-to-its-contents/11858803#11858803
         """
 
-        docHeight = self.document().size().height() + 5
-        if (
-            self.heightMin <= docHeight <= self.heightMax
-            and docHeight > self.minimumHeight()
-        ):
+        # QPlainTextDocumentLayout reports the document height as a line
+        # count, including lines created by soft wrapping
+        lines = int(self.document().size().height())
+        docHeight = (lines + 1) * self._lineSpacing + 5
+        if self.heightMin <= docHeight <= self.heightMax and docHeight > self._minHeight:
+            self._minHeight = docHeight
             self.setMinimumHeight(docHeight)
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
@@ -161,7 +214,12 @@ class PrefEditor(QTextEdit):
         """
 
         key = event.key()
-        if key in (Qt.Key_Enter, Qt.Key_Return, Qt.Key_Tab):
+        if key in _SUPPRESSED_KEYS:
+            return
+
+        # Fast reject path for ordinary keystrokes
+        if key not in _NAV_KEYS:
+            super().keyPressEvent(event)
             return
 
         cursor = self.textCursor()  # type: QTextCursor
@@ -169,16 +227,7 @@ class PrefEditor(QTextEdit):
         if cursor.hasSelection() and key in (Qt.Key_Left, Qt.Key_Right):
             # Pass the key press on and let the selection deselect
             pass
-        elif key in (
-            Qt.Key_Left,
-            Qt.Key_Right,
-            Qt.Key_Home,
-            Qt.Key_End,
-            Qt.Key_PageUp,
-            Qt.Key_PageDown,
-            Qt.Key_Up,
-            Qt.Key_Down,
-        ):
+        else:
             # Navigation key was pressed
 
             # Was ctrl key pressed too?
@@ -188,30 +237,12 @@ class PrefEditor(QTextEdit):
 
             # This event is called before the cursor is moved, so
             # move the cursor as if it would be moved
-            if key == Qt.Key_Right and not cursor.atEnd():
-                if ctrl_key:
-                    cursor.movePosition(QTextCursor.WordRight)
-                else:
-                    cursor.movePosition(QTextCursor.Right)
-            elif key == Qt.Key_Left and not cursor.atStart():
-                if ctrl_key:
-                    cursor.movePosition(QTextCursor.WordLeft)
-                else:
-                    cursor.movePosition(QTextCursor.Left)
-            elif key == Qt.Key_Up:
-                cursor.movePosition(QTextCursor.Up)
-            elif key == Qt.Key_Down:
-                cursor.movePosition(QTextCursor.Down)
-            elif key in (Qt.Key_Home, Qt.Key_PageUp):
-                if ctrl_key or key == Qt.Key_PageUp:
-                    cursor.movePosition(QTextCursor.StartOfBlock)
-                else:
-                    cursor.movePosition(QTextCursor.StartOfLine)
-            elif key in (Qt.Key_End, Qt.Key_PageDown):
-                if ctrl_key or key == Qt.Key_PageDown:
-                    cursor.movePosition(QTextCursor.EndOfBlock)
-                else:
-                    cursor.movePosition(QTextCursor.EndOfLine)
+            if not (
+                (key == Qt.Key_Right and cursor.atEnd())
+                or (key == Qt.Key_Left and cursor.atStart())
+            ):
+                move, ctrl_move = _NAV_MOVES[key]
+                cursor.movePosition(ctrl_move if ctrl_key else move)
 
             # Get position of where the cursor would move to
             position = cursor.position()
@@ -254,53 +285,52 @@ class PrefEditor(QTextEdit):
         start = end = -1
         left_start = left_end = -1
         pref_position = PrefPosition.not_here
-        b = self.highlighter.boundaries
-        if not (len(b)):
+        starts = self.highlighter.starts
+        ends = self.highlighter.ends
+        if not starts:
             return (pref_position, start, end, left_start, left_end)
 
-        index = b.bisect_left((position, 0))
+        index = bisect_left(starts, position)
         # Special cases
         if index == 0:
             # At or to the left of the first pref value
-            if b[0][0] == position:
+            if starts[0] == position:
                 pref_position = PrefPosition.at
-                start, end = b[0]
-        elif index == len(b):
+                start, end = starts[0], ends[0]
+        elif index == len(starts):
             # To the right of or in the last pref value
-            if position <= b[-1][1]:
-                start, end = b[-1]
+            if position <= ends[-1]:
+                start, end = starts[-1], ends[-1]
                 pref_position = PrefPosition.positioned_in
-            elif b[-1][1] == position - 1:
-                left_start, left_end = b[-1]
+            elif ends[-1] == position - 1:
+                left_start, left_end = starts[-1], ends[-1]
                 pref_position = PrefPosition.on_left
         else:
-            left = b[index - 1]
-            right = b[index]
-
-            at = right[0] == position
-            to_left = left[1] == position - 1
+            at = starts[index] == position
+            to_left = ends[index - 1] == position - 1
             if at and to_left:
                 pref_position = PrefPosition.on_left_and_at
-                start, end = right
-                left_start, left_end = left
+                start, end = starts[index], ends[index]
+                left_start, left_end = starts[index - 1], ends[index - 1]
             elif at:
                 pref_position = PrefPosition.at
-                start, end = right
+                start, end = starts[index], ends[index]
             elif to_left:
                 pref_position = PrefPosition.on_left
-                left_start, left_end = left
-            elif position <= left[1]:
+                left_start, left_end = starts[index - 1], ends[index - 1]
+            elif position <= ends[index - 1]:
                 pref_position = PrefPosition.positioned_in
-                start, end = b[index - 1]
+                start, end = starts[index - 1], ends[index - 1]
 
         return (pref_position, start, end, left_start, left_end)
 
     def displayPrefList(self, pref_list: Sequence[str]) -> None:
         p = pref_list
+        mapper = self.pref_mapper
         values = []
         for i in range(0, len(pref_list), 3):
             try:
-                value = "<{}>".format(self.pref_mapper[(p[i], p[i + 1], p[i + 2])])
+                value = "<{}>".format(mapper[(p[i], p[i + 1], p[i + 2])])
             except KeyError:
                 if p[i] == SEPARATOR:
                     value = SEPARATOR
@@ -309,48 +339,113 @@ class PrefEditor(QTextEdit):
                     value = p[i + 1]
             values.append(value)
 
-        self.document().clear()
-        cursor = self.textCursor()  # type: QTextCursor
-        cursor.insertText("".join(values))
+        # Detach the highlighter while the new contents are set, so that a
+        # single highlight pass runs over the final content instead of one
+        # per affected block during insertion
+        self.highlighter.setDocument(None)
+        self.highlighter.clearBoundaries()
+        self.setPlainText("".join(values))
+        self.highlighter.setDocument(self.document())
+        # Highlight the new contents synchronously: the rehighlight Qt
+        # itself schedules after reattachment runs only after any pref list
+        # generation the setPlainText edit already queued, and it does not
+        # emit contentsChange, so generation would run against empty
+        # boundaries and never be corrected
+        self.highlighter.rehighlight()
+        self.schedulePrefListGeneration()
 
     def insertPrefValue(self, pref_value: str) -> None:
         cursor = self.textCursor()  # type: QTextCursor
         cursor.insertText("<{}>".format(pref_value))
 
+    def setMaxHighlightSize(self, size: int) -> None:
+        """
+        Set the document size in characters above which syntax highlighting
+        is skipped
+
+        :param size: the size limit in characters
+        """
+
+        self.highlighter.max_highlight_size = size
+
     def _setHighlighter(self) -> None:
         self.highlighter = PrefHighlighter(
-            list(self.string_to_pref_mapper.keys()), self.pref_color, self.document()
+            list(self.pref_mapper.values()), self.pref_color, self.document()
         )
 
+        # Map each highlighted token, e.g. '<Date (YYYY)>', directly to its
+        # pref triple and color, so generating the pref list needs one dict
+        # lookup per token and no string slicing
+        string_to_pref = self.string_to_pref_mapper
+        self.token_to_triple = {
+            "<{}>".format(pref): string_to_pref[pref]
+            for pref in self.pref_mapper.values()
+        }
+        self.token_to_color = {
+            token: self.pref_color[token] for token in self.token_to_triple
+        }
+
         # when color coding of text in the editor is complete,
         # generate the preference list
-        self.highlighter.blockHighlighted.connect(self.generatePrefList)
+        self.highlighter.blockHighlighted.connect(self.schedulePrefListGeneration)
+
+    @pyqtSlot()
+    def schedulePrefListGeneration(self) -> None:
+        """
+        Coalesce a burst of blockHighlighted signals into a single pref list
+        regeneration once control returns to the event loop
+        """
+
+        if not self._generate_pending:
+            self._generate_pending = True
+            QTimer.singleShot(0, self.generatePrefList)
 
     def setPrefMapper(
         self, pref_mapper: Dict[Tuple[str, str, str], str], pref_color: Dict[str, str]
     ) -> None:
         self.pref_mapper = pref_mapper
-        self.string_to_pref_mapper = {value: key for key, value in pref_mapper.items()}
+        self._string_to_pref_mapper = None
 
         self.pref_color = pref_color
         self._setHighlighter()
 
+    @property
+    def string_to_pref_mapper(self) -> Dict[str, Tuple[str, str, str]]:
+        """
+        Reverse view of pref_mapper, built on first use and invalidated
+        whenever the mapper changes
+        """
+
+        if self._string_to_pref_mapper is None:
+            self._string_to_pref_mapper = {
+                value: key for key, value in self.pref_mapper.items()
+            }
+        return self._string_to_pref_mapper
+
     def _parseTextFragment(self, text_fragment) -> None:
-        if self.subfolder:
-            text_fragments = text_fragment.split(os.sep)
-            for index, text_fragment in enumerate(text_fragments):
-                if text_fragment:
-                    self.user_pref_list.extend([TEXT, text_fragment, ""])
-                    self.user_pref_colors.append("")
-                if index < len(text_fragments) - 1:
-                    self.user_pref_list.extend([SEPARATOR, "", ""])
-                    self.user_pref_colors.append("")
-        else:
-            self.user_pref_list.extend([TEXT, text_fragment, ""])
-            self.user_pref_colors.append("")
+        # File renaming mode emits a text element even for an empty
+        # fragment, e.g. between two adjacent pref values: saved pref lists
+        # contain these empty elements and are matched by exact equality
+        if not self.subfolder:
+            self.user_pref_list += (TEXT, text_fragment, _EMPTY_COLOR)
+            self.user_pref_colors.append(_EMPTY_COLOR)
+            return
+
+        # The common case: no separator to handle, so no need to split
+        if self._sep not in text_fragment:
+            if text_fragment:
+                self.user_pref_list += (TEXT, text_fragment, _EMPTY_COLOR)
+                self.user_pref_colors.append(_EMPTY_COLOR)
+            return
 
-    def _addColor(self, pref_defn: str) -> None:
-        self.user_pref_colors.append(self.pref_color[pref_defn])
+        text_fragments = text_fragment.split(self._sep)
+        for index, text_fragment in enumerate(text_fragments):
+            if text_fragment:
+                self.user_pref_list += (TEXT, text_fragment, _EMPTY_COLOR)
+                self.user_pref_colors.append(_EMPTY_COLOR)
+            if index < len(text_fragments) - 1:
+                self.user_pref_list += _SEP_TRIPLE
+                self.user_pref_colors.append(_EMPTY_COLOR)
 
     @pyqtSlot()
     def generatePrefList(self) -> None:
@@ -359,49 +454,65 @@ class PrefEditor(QTextEdit):
         to generate the user's pref list
         """
 
+        self._generate_pending = False
+
         text = self.document().toPlainText()
-        b = self.highlighter.boundaries
+        starts = self.highlighter.starts
+        ends = self.highlighter.ends
+
+        # If neither the text nor the boundaries have changed since the last
+        # run, the pref list is already current
+        digest = hash((text, tuple(starts), tuple(ends)))
+        if digest == self._prev_digest:
+            return
+        self._prev_digest = digest
 
         self.user_pref_list = pl = []  # type: List[str]
         self.user_pref_colors = []  # type: List[str]
 
-        # Handle any text at the very beginning
-        if b and b[0][0] > 0:
-            text_fragment = text[: b[0][0]]
-            self._parseTextFragment(text_fragment)
-
-        if len(b) > 1:
-            for index, item in enumerate(b[1:]):
-                start, end = b[index]
-                # Add + 1 to start to remove the opening <
-                pl.extend(self.string_to_pref_mapper[text[start + 1 : end]])
-                # Add + 1 to start to include the closing >
-                self._addColor(text[start : end + 1])
-
-                text_fragment = text[b[index][1] + 1 : item[0]]
-                self._parseTextFragment(text_fragment)
-
-        # Handle the final pref value
-        if b:
-            start, end = b[-1]
-            # Add + 1 to start to remove the opening <
-            pl.extend(self.string_to_pref_mapper[text[start + 1 : end]])
-            # Add + 1 to start to include the closing >
-            self._addColor(text[start : end + 1])
-            final = end + 1
-        else:
-            final = 0
-
-        # Handle any remaining text at the very end (or the complete string if there are
-        # no pref definition values)
-        if final < len(text):
-            text_fragment = text[final:]
-            self._parseTextFragment(text_fragment)
+        # Walk the text in a single pass, alternating between plain text
+        # fragments and highlighted pref values
+        pos = 0
+        token_to_triple = self.token_to_triple
+        token_to_color = self.token_to_color
+        colors = self.user_pref_colors
+        for index, (start, end, token) in enumerate(
+            zip(starts, ends, self.highlighter.tokens)
+        ):
+            # Parse the gap before every pref value except the first, even
+            # when it is empty: in file renaming mode an empty gap between
+            # adjacent pref values produces an empty text element, and
+            # saved pref lists contain those elements and are matched by
+            # exact equality
+            if index or start:
+                self._parseTextFragment(text[pos:start])
+            pl.extend(token_to_triple[token])
+            colors.append(token_to_color[token])
+            pos = end + 1
+
+        # Handle any remaining text at the very end (or the complete string
+        # if there are no pref definition values)
+        if pos < len(text):
+            self._parseTextFragment(text[pos:])
 
         assert len(self.user_pref_colors) == len(self.user_pref_list) / 3
         self.prefListGenerated.emit()
 
 
+class PrefBlockCache(QTextBlockUserData):
+    """
+    Cache of a block's highlight results, allowing an unchanged block to
+    replay its formats without rescanning the text
+    """
+
+    def __init__(
+        self, text_hash: int, boundaries: List[Tuple[int, int, str]]
+    ) -> None:
+        super().__init__()
+        self.text_hash = text_hash
+        self.boundaries = boundaries
+
+
 class PrefHighlighter(QSyntaxHighlighter):
     """
     Highlight non-text preference values in the editor
@@ -417,49 +528,173 @@ class PrefHighlighter(QSyntaxHighlighter):
     ) -> None:
         super().__init__(document)
 
-        # Where detected preference values start and end:
-        # [(start, end), (start, end), ...]
-        self.boundaries = SortedList()
-
-        pref_defns = ("<{}>".format(pref) for pref in pref_defn_strings)
-        self.highlightingRules = []
+        # Where detected preference values start and end, relative to the
+        # block they were found in, along with the matched pref value, is
+        # stored on each block as PrefBlockCache user data, so the cached
+        # boundaries move, and are destroyed, with their block.
+        # Merged, document-wide view of the per-block boundaries as three
+        # parallel sorted lists, built lazily
+        self._merged_starts = None  # type: Optional[List[int]]
+        self._merged_ends = None  # type: Optional[List[int]]
+        self._merged_tokens = None  # type: Optional[List[str]]
+
+        # QSyntaxHighlighter slows down dramatically on very large
+        # documents, e.g. when an enormous path is pasted into the editor.
+        # Above this size, skip highlighting altogether.
+        self.max_highlight_size = 500000
+        self.highlighting_disabled = False
+
+        pref_defns = ["<{}>".format(pref) for pref in pref_defn_strings]
+        self.highlightingRules = dict()  # type: Dict[str, QTextCharFormat]
         for pref in pref_defns:
             format = QTextCharFormat()
             format.setForeground(QBrush(QColor(pref_color[pref])))
-            self.highlightingRules.append((pref, format))
-
-    def find_all(self, text: str, pref_defn: str):
-        """
-        Find all occurrences of a preference definition in the text
-        :param text: text to search
-        :param pref_defn: the preference definition
-        :return: yield the position in the document's text
-        """
-        if not len(pref_defn):
-            return  # do not use raise StopIteration as it is Python 3.7 incompatible
-        start = 0
-        while True:
-            start = text.find(pref_defn, start)
-            if start == -1:
-                # do not use raise StopIteration as it is Python 3.7 incompatible
-                return
-            yield start
-            start += len(pref_defn)
+            self.highlightingRules[pref] = format
+        # One combined pattern that locates every preference value in a
+        # single scan of the text
+        self.pattern = re.compile("|".join(re.escape(pref) for pref in pref_defns))
+
+        # Emit blockHighlighted once per document edit, after all affected
+        # blocks have been rehighlighted, instead of once per block
+        document.contentsChange.connect(self.documentContentsChanged)
+
+    @property
+    def starts(self) -> List[int]:
+        """
+        Document-wide sorted list of positions at which pref values start,
+        rebuilt lazily after a document change
+        """
+
+        if self._merged_starts is None:
+            self._mergeBoundaries()
+        return self._merged_starts
+
+    @property
+    def ends(self) -> List[int]:
+        """
+        Document-wide sorted list of positions at which pref values end,
+        parallel to starts
+        """
+
+        if self._merged_ends is None:
+            self._mergeBoundaries()
+        return self._merged_ends
+
+    @property
+    def tokens(self) -> List[str]:
+        """
+        Document-wide list of the matched pref values, parallel to starts
+        """
+
+        if self._merged_tokens is None:
+            self._mergeBoundaries()
+        return self._merged_tokens
+
+    def clearBoundaries(self) -> None:
+        """
+        Discard the merged boundary view, e.g. before a bulk document load
+        """
+
+        self._merged_starts = self._merged_ends = self._merged_tokens = None
+
+    def _scanText(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Locate every pref value in the text in a single scan
+
+        :param text: a block's text
+        :return: (start, end, token) for each pref value found
+        """
+
+        return [
+            (match.start(), match.end() - 1, match.group())
+            for match in self.pattern.finditer(text)
+        ]
+
+    def _mergeBoundaries(self) -> None:
+        """
+        Merge the per-block boundary lists into document-wide parallel
+        lists of start and end positions and tokens.
+
+        The blocks themselves are walked in document order, reading each
+        block's cached boundaries, so deleted blocks simply disappear from
+        the merge and edits cannot leave boundaries attributed to the
+        wrong block. Matches within a block are found left-to-right, so
+        appending preserves sorted order.
+        """
+
+        starts = []  # type: List[int]
+        ends = []  # type: List[int]
+        tokens = []  # type: List[str]
+        if not self.highlighting_disabled:
+            block = self.document().begin()
+            while block.isValid():
+                text = block.text()
+                cache = block.userData()
+                if cache is not None and cache.text_hash == hash(text):
+                    boundaries = cache.boundaries
+                else:
+                    # The block has not been highlighted since its text
+                    # last changed
+                    boundaries = self._scanText(text)
+                offset = block.position()
+                for start, end, token in boundaries:
+                    starts.append(offset + start)
+                    ends.append(offset + end)
+                    tokens.append(token)
+                block = block.next()
+        self._merged_starts = starts
+        self._merged_ends = ends
+        self._merged_tokens = tokens
 
     def highlightBlock(self, text: str) -> None:
 
-        # Recreate the preference value from scratch
-        self.boundaries = SortedList()
+        if self.document().characterCount() > self.max_highlight_size:
+            if not self.highlighting_disabled:
+                logging.debug(
+                    "Syntax highlighting disabled: document exceeds %s characters",
+                    self.max_highlight_size,
+                )
+                self.highlighting_disabled = True
+            self._merged_starts = self._merged_ends = self._merged_tokens = None
+            return
 
-        for expression, format in self.highlightingRules:
-            for index in self.find_all(text, expression):
-                length = len(expression)
-                self.setFormat(index, length, format)
-                self.boundaries.add((index, index + length - 1))
+        self.highlighting_disabled = False
+
+        text_hash = hash(text)
+        cache = self.currentBlockUserData()
+        if cache is not None and cache.text_hash == text_hash:
+            # The block's text is unchanged: replay the cached formats
+            # without rescanning
+            boundaries = cache.boundaries
+            for start, end, token in boundaries:
+                self.setFormat(start, end - start + 1, self.highlightingRules[token])
+        else:
+            # Recreate this block's boundaries from scratch, replacing any
+            # stale cache from a previous highlighting pass
+            boundaries = self._scanText(text)
+            for start, end, token in boundaries:
+                self.setFormat(start, end - start + 1, self.highlightingRules[token])
+            self.setCurrentBlockUserData(PrefBlockCache(text_hash, boundaries))
+
+        self._merged_starts = self._merged_ends = self._merged_tokens = None
+
+    @pyqtSlot(int, int, int)
+    def documentContentsChanged(
+        self, position: int, charsRemoved: int, charsAdded: int
+    ) -> None:
+        """
+        Called once per document edit, after the syntax highlighter has
+        rehighlighted all blocks the edit affected
+        """
+
+        # Any edit can shift the positions of the blocks that follow it,
+        # even blocks the highlighter did not revisit
+        self._merged_starts = self._merged_ends = self._merged_tokens = None
 
         self.blockHighlighted.emit()
 
 
+@functools.lru_cache(maxsize=None)
 def make_subfolder_menu_entry(prefs: Tuple[str]) -> str:
     """
     Create the text for a menu / combobox item
@@ -480,6 +715,7 @@ def make_subfolder_menu_entry(prefs: Tuple[str]) -> str:
     )
 
 
+@functools.lru_cache(maxsize=None)
 def make_rename_menu_entry(prefs: Tuple[str]) -> str:
     """
     Create the text for a menu / combobox item
@@ -500,6 +736,22 @@ def make_rename_menu_entry(prefs: Tuple[str]) -> str:
     )
 
 
+# Menu / combobox entries for the built-in presets, computed once at import
+# time because the built-in presets never change
+PHOTO_SUBFOLDER_MENU_ENTRIES = tuple(
+    make_subfolder_menu_entry(pref) for pref in PHOTO_SUBFOLDER_MENU_DEFAULTS
+)
+VIDEO_SUBFOLDER_MENU_ENTRIES = tuple(
+    make_subfolder_menu_entry(pref) for pref in VIDEO_SUBFOLDER_MENU_DEFAULTS
+)
+PHOTO_RENAME_MENU_ENTRIES = tuple(
+    make_rename_menu_entry(pref) for pref in PHOTO_RENAME_MENU_DEFAULTS
+)
+VIDEO_RENAME_MENU_ENTRIES = tuple(
+    make_rename_menu_entry(pref) for pref in VIDEO_RENAME_MENU_DEFAULTS
+)
+
+
 class PresetComboBox(QComboBox):
     """
     Combox box displaying built-in presets, custom presets,
@@ -539,13 +791,17 @@ class PresetComboBox(QComboBox):
 
         if preset_type == PresetPrefType.preset_photo_subfolder:
             self.builtin_presets = PHOTO_SUBFOLDER_MENU_DEFAULTS
+            self.builtin_preset_entries = PHOTO_SUBFOLDER_MENU_ENTRIES
         elif preset_type == PresetPrefType.preset_video_subfolder:
             self.builtin_presets = VIDEO_SUBFOLDER_MENU_DEFAULTS
+            self.builtin_preset_entries = VIDEO_SUBFOLDER_MENU_ENTRIES
         elif preset_type == PresetPrefType.preset_photo_rename:
             self.builtin_presets = PHOTO_RENAME_MENU_DEFAULTS
+            self.builtin_preset_entries = PHOTO_RENAME_MENU_ENTRIES
         else:
             assert preset_type == PresetPrefType.preset_video_rename
             self.builtin_presets = VIDEO_RENAME_MENU_DEFAULTS
+            self.builtin_preset_entries = VIDEO_RENAME_MENU_ENTRIES
 
         self._setup_entries(preset_names)
 
@@ -553,13 +809,17 @@ class PresetComboBox(QComboBox):
 
         idx = 0
 
+        # Pre-bind the bound method and enum member used in the loops below
+        addItem = self.addItem
+        builtin = PresetClass.builtin
+
         if self.edit_mode:
-            for pref in self.builtin_presets:
-                self.addItem(make_subfolder_menu_entry(pref), PresetClass.builtin)
+            for entry in self.builtin_preset_entries:
+                addItem(entry, builtin)
                 idx += 1
         else:
             for pref in self.builtin_presets:
-                self.addItem(pref[0], PresetClass.builtin)
+                addItem(pref[0], builtin)
                 idx += 1
 
         if not len(preset_names):
@@ -573,8 +833,9 @@ class PresetComboBox(QComboBox):
             self.insertSeparator(idx)
             idx += 1
 
+            custom = PresetClass.custom
             for name in preset_names:
-                self.addItem(name, PresetClass.custom)
+                addItem(name, custom)
                 idx += 1
 
         self.insertSeparator(idx)
@@ -884,49 +1145,61 @@ class PrefDialog(QDialog):
             self.setWindowTitle(_("Photo Subfolder Generation Editor"))
             self.preset_type = PresetPrefType.preset_photo_subfolder
             self.builtin_pref_lists = PHOTO_SUBFOLDER_MENU_DEFAULTS_CONV
-            self.builtin_pref_names = [
-                make_subfolder_menu_entry(pref)
-                for pref in PHOTO_SUBFOLDER_MENU_DEFAULTS
-            ]
+            self.builtin_pref_names = list(PHOTO_SUBFOLDER_MENU_ENTRIES)
         elif generation_type == NameGenerationType.video_subfolder:
             self.setWindowTitle(_("Video Subfolder Generation Editor"))
             self.preset_type = PresetPrefType.preset_video_subfolder
             self.builtin_pref_lists = VIDEO_SUBFOLDER_MENU_DEFAULTS_CONV
-            self.builtin_pref_names = [
-                make_subfolder_menu_entry(pref)
-                for pref in VIDEO_SUBFOLDER_MENU_DEFAULTS
-            ]
+            self.builtin_pref_names = list(VIDEO_SUBFOLDER_MENU_ENTRIES)
         elif generation_type == NameGenerationType.photo_name:
             self.setWindowTitle(_("Photo Renaming Editor"))
             self.preset_type = PresetPrefType.preset_photo_rename
             self.builtin_pref_lists = PHOTO_RENAME_MENU_DEFAULTS_CONV
-            self.builtin_pref_names = [
-                make_rename_menu_entry(pref) for pref in PHOTO_RENAME_MENU_DEFAULTS
-            ]
+            self.builtin_pref_names = list(PHOTO_RENAME_MENU_ENTRIES)
         else:
             self.setWindowTitle(_("Video Renaming Editor"))
             self.preset_type = PresetPrefType.preset_video_rename
             self.builtin_pref_lists = VIDEO_RENAME_MENU_DEFAULTS_CONV
-            self.builtin_pref_names = [
-                make_rename_menu_entry(pref) for pref in VIDEO_RENAME_MENU_DEFAULTS
-            ]
+            self.builtin_pref_names = list(VIDEO_RENAME_MENU_ENTRIES)
 
         self.prefs = prefs
         self.max_entries = max_entries
 
+        # Cache of the most recently generated example, keyed on the label
+        # width and the name parts, so resize pulses that do not change the
+        # elide boundary skip regenerating it
+        self._example_cache = None  # type: Optional[Tuple[Tuple, str, bool]]
+        self._last_example_html = None  # type: Optional[str]
+        self._example_metrics = None  # type: Optional[QFontMetrics]
+        self._example_font_key = None  # type: Optional[str]
+        self._preset_match_cache = None  # type: Optional[Tuple[Tuple[str, ...], int]]
+        self._combined_pref_names = None  # type: Optional[List[str]]
+        self._combined_pref_lists = None  # type: Optional[Tuple[List[str], ...]]
+
         # Cache custom preset name and pref lists
         self.updateCachedPrefLists()
 
         self.current_custom_name = None
 
-        # Setup values needed for name generation
+        # The generation type never changes after construction, so one name
+        # generator instance serves for the dialog's lifetime; its pref
+        # list is replaced as the user edits
+        if generation_type == NameGenerationType.photo_name:
+            self.name_generator = gn.PhotoName([])
+        elif generation_type == NameGenerationType.video_name:
+            self.name_generator = gn.VideoName([])
+        elif generation_type == NameGenerationType.photo_subfolder:
+            self.name_generator = gn.PhotoSubfolder([])
+        else:
+            assert generation_type == NameGenerationType.video_subfolder
+            self.name_generator = gn.VideoSubfolder([])
 
-        self.sample_rpd_file = make_sample_rpd_file(
-            sample_rpd_file=sample_rpd_file,
-            sample_job_code=self.prefs.most_recent_job_code(missing=_("Job Code")),
-            prefs=self.prefs,
-            generation_type=generation_type,
-        )
+        # Setup values needed for name generation, deferred until after the
+        # dialog is on screen so that preparing the sample file does not
+        # delay opening the dialog
+        self.sample_rpd_file = None
+        self._pending_sample_rpd_file = sample_rpd_file
+        QTimer.singleShot(0, self.loadSampleFile)
 
         # Setup widgets and helper values
 
@@ -937,6 +1210,13 @@ class PrefDialog(QDialog):
             'fully generate the name. Please use other renaming options.</i>'
         )
 
+        # Translators: please do not modify or leave out html formatting tags like
+        # <i> and <b>. These are used to format the text the users sees
+        highlighting_msg = _(
+            '<b><font color="red">Warning:</font></b> <i>Syntax highlighting is '
+            'turned off because the entered text is too long.</i>'
+        )
+
         self.is_subfolder = generation_type in (
             NameGenerationType.photo_subfolder,
             NameGenerationType.video_subfolder,
@@ -964,7 +1244,12 @@ class PrefDialog(QDialog):
                 "There is no need start or end with the folder separator </i> "
                 "%(separator)s<i>, because it is added automatically."
             ) % dict(separator=os.sep)
-            messages = (warning_msg, subfolder_msg, subfolder_first_char_msg)
+            messages = (
+                warning_msg,
+                subfolder_msg,
+                subfolder_first_char_msg,
+                highlighting_msg,
+            )
         else:
             # Translators: please do not modify or leave out html formatting tags like
             # <i> and <b>. These are used to format the text the users sees
@@ -972,9 +1257,11 @@ class PrefDialog(QDialog):
                 '<b><font color="red">Warning:</font></b> <i>Unique filenames may not '
                 'be generated. Make filenames unique by using Sequence values.</i>'
             )
-            messages = (warning_msg, unique_msg)
+            messages = (warning_msg, unique_msg, highlighting_msg)
 
         self.messageWidget = MessageWidget(messages=messages)
+        # message index 0 is the blank message
+        self.highlighting_message_index = len(messages)
 
         self.editor = PrefEditor(subfolder=self.is_subfolder)
         sizePolicy = QSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
@@ -995,6 +1282,16 @@ class PrefDialog(QDialog):
         )
         self.preset.activated.connect(self.presetComboItemActivated)
 
+        # Dispatch table consulted each time the user activates a preset
+        # combo box item
+        self._preset_dispatch = {
+            PresetClass.new_preset: self._newPresetActivated,
+            PresetClass.builtin: self._presetSelected,
+            PresetClass.custom: self._presetSelected,
+            PresetClass.remove_all: self._removeAllPresetsActivated,
+            PresetClass.update_preset: self._updatePresetActivated,
+        }
+
         glayout = QGridLayout()
         presetLabel = QLabel(_("Preset:"))
         exampleLabel = QLabel(_("Example:"))
@@ -1034,7 +1331,6 @@ class PrefDialog(QDialog):
 
         self.pushButtonSizePolicy = QSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
 
-        self.mapper = QSignalMapper(self)
         self.widget_mapper = dict()  # type: Dict[str, Union[QComboBox, QLabel]]
         self.pref_mapper = dict()  # type: Dict[Tuple[str, str, str], str]
         self.pref_color = dict()  # type: Dict[str, str]
@@ -1042,11 +1338,35 @@ class PrefDialog(QDialog):
         titles = [title for title in pref_defn if title not in (TEXT, SEPARATOR)]
         pref_colors = {title: color.value for title, color in zip(titles, CustomColors)}
         self.filename_pref_color = pref_colors[FILENAME]
+        # Ready-made span prefixes, so rendering the example does not
+        # re-format the same color strings on every redraw
+        self._color_span_prefix = {
+            color: '<span style="color: {};">'.format(color)
+            for color in pref_colors.values()
+        }
+
+        # Shared values for the color code labels made in the loop below,
+        # saving a QFont / QFontMetrics construction per entry
+        size = QFontMetrics(QFont()).height()
+        self._color_label_size = QSize(size, size)
+        self._color_label_stylesheet = dict()  # type: Dict[str, str]
+
+        # Local aliases for the dicts populated in the loop below, which can
+        # run hundreds of iterations for subfolder prefs
+        pm = self.pref_mapper
+        pc = self.pref_color
+
+        # Translators: appears in a combobox, e.g. Image Date (YYYY)
+        choice_variant = _("{choice} ({variant})")
 
         for title in titles:
-            title_i18n = _(title)
+            title_i18n = _t(title)
             color = pref_colors[title]
             level1 = pref_defn[title]
+            # Accumulate this title's mapper and color entries and insert
+            # them in bulk below, instead of one dict assignment at a time
+            pm_items = []  # type: List[Tuple[Tuple[str, str, str], str]]
+            pc_items = []  # type: List[Tuple[str, str]]
             gb = QGroupBox(title_i18n)
             gb.setSizePolicy(gbSizePolicy)
             gb.setFlat(True)
@@ -1056,11 +1376,10 @@ class PrefDialog(QDialog):
             if level1 is None:
                 assert title == JOB_CODE
                 widget1 = QLabel(" " + title_i18n)
-                widget2 = self.makeInsertButton()
+                widget2 = self.makeInsertButton(title)
                 self.widget_mapper[title] = widget1
-                self.mapper.setMapping(widget2, title)
-                self.pref_mapper[(title, "", "")] = title_i18n
-                self.pref_color["<{}>".format(title_i18n)] = color
+                pm_items.append(((title, "", ""), title_i18n))
+                pc_items.append(("<{}>".format(title_i18n), color))
                 gLayout.addWidget(self.makeColorCodeLabel(color), 0, 0)
                 gLayout.addWidget(widget1, 0, 1)
                 gLayout.addWidget(widget2, 0, 2)
@@ -1068,63 +1387,72 @@ class PrefDialog(QDialog):
                 elements = []
                 data = []
                 for element in level1:
-                    element_i18n = _(element)
+                    element_i18n = _t(element)
                     level2 = level1[element]
                     if level2 is None:
                         elements.append(element_i18n)
                         data.append([METADATA, element, ""])
-                        self.pref_mapper[(METADATA, element, "")] = element_i18n
-                        self.pref_color["<{}>".format(element_i18n)] = color
+                        pm_items.append(((METADATA, element, ""), element_i18n))
+                        pc_items.append(("<{}>".format(element_i18n), color))
                     else:
                         for e in level2:
-                            e_i18n = _(e)
-                            # Translators: appears in a combobox, e.g. Image Date (YYYY)
-                            item = _("{choice} ({variant})").format(
+                            e_i18n = _t(e)
+                            item = choice_variant.format(
                                 choice=element_i18n, variant=e_i18n
                             )
                             elements.append(item)
                             data.append([METADATA, element, e])
-                            self.pref_mapper[(METADATA, element, e)] = item
-                            self.pref_color["<{}>".format(item)] = color
+                            pm_items.append(((METADATA, element, e), item))
+                            pc_items.append(("<{}>".format(item), color))
                 widget1 = EditorCombobox()
-                for element, data_item in zip(elements, data):
-                    widget1.addItem(element, data_item)
-                widget2 = self.makeInsertButton()
-                widget1.currentTextChanged.connect(self.mapper.map)
-                self.mapper.setMapping(widget2, title)
-                self.mapper.setMapping(widget1, title)
+                # Populate in bulk, with signals off: one addItems call in
+                # place of a Python-level addItem call per entry
+                widget1.blockSignals(True)
+                widget1.addItems(elements)
+                for i, data_item in enumerate(data):
+                    widget1.setItemData(i, data_item)
+                widget1.blockSignals(False)
+                widget2 = self.makeInsertButton(title)
+                widget1.currentTextChanged.connect(
+                    lambda text, name=title: self.choiceMade(name)
+                )
                 self.widget_mapper[title] = widget1
                 gLayout.addWidget(self.makeColorCodeLabel(color), 0, 0)
                 gLayout.addWidget(widget1, 0, 1)
                 gLayout.addWidget(widget2, 0, 2)
             else:
-                for row, level1 in enumerate(pref_defn[title]):
+                defn = level1
+                for row, level1 in enumerate(defn):
                     widget1 = EditorCombobox()
-                    level1_i18n = _(level1)
-                    items = (
-                        _("{choice} ({variant})").format(
-                            choice=level1_i18n, variant=_(element)
-                        )
-                        for element in pref_defn[title][level1]
-                    )
-                    data = (
-                        [title, level1, element] for element in pref_defn[title][level1]
+                    level1_i18n = _t(level1)
+                    elements = defn[level1]
+                    items = [
+                        choice_variant.format(choice=level1_i18n, variant=_t(element))
+                        for element in elements
+                    ]
+                    widget1.blockSignals(True)
+                    widget1.addItems(items)
+                    for i, (item, element) in enumerate(zip(items, elements)):
+                        data_item = [title, level1, element]
+                        widget1.setItemData(i, data_item)
+                        pm_items.append(((title, level1, element), item))
+                        pc_items.append(("<{}>".format(item), color))
+                    widget1.blockSignals(False)
+                    widget2 = self.makeInsertButton(level1)
+                    widget1.currentTextChanged.connect(
+                        lambda text, name=level1: self.choiceMade(name)
                     )
-                    for item, data_item in zip(items, data):
-                        widget1.addItem(item, data_item)
-                        self.pref_mapper[tuple(data_item)] = item
-                        self.pref_color["<{}>".format(item)] = color
-                    widget2 = self.makeInsertButton()
-                    widget1.currentTextChanged.connect(self.mapper.map)
-
-                    self.mapper.setMapping(widget2, level1)
-                    self.mapper.setMapping(widget1, level1)
                     self.widget_mapper[level1] = widget1
                     gLayout.addWidget(self.makeColorCodeLabel(color), row, 0)
                     gLayout.addWidget(widget1, row, 1)
                     gLayout.addWidget(widget2, row, 2)
 
-        self.mapper.mapped[str].connect(self.choiceMade)
+            pm.update(pm_items)
+            pc.update(pc_items)
+
+        # The widget set is immutable from here on: freeze it for the
+        # iterations in setWidgetSizes
+        self.mapped_widgets = tuple(self.widget_mapper.values())
 
         buttonBox = QDialogButtonBox(
             QDialogButtonBox.Cancel | QDialogButtonBox.Ok | QDialogButtonBox.Help
@@ -1157,9 +1485,16 @@ class PrefDialog(QDialog):
             "http://www.damonlynch.net/rapid/documentation/{}".format(location)
         )
 
-    def makeInsertButton(self) -> QPushButton:
+    def makeInsertButton(self, name: str) -> QPushButton:
+        """
+        Create an Insert button that passes its widget name to choiceMade
+
+        :param name: name that uniquely identifies the widget the button
+         belongs to
+        """
+
         w = QPushButton(_("Insert"))
-        w.clicked.connect(self.mapper.map)
+        w.clicked.connect(lambda checked=False, name=name: self.choiceMade(name))
         w.setSizePolicy(self.pushButtonSizePolicy)
         return w
 
@@ -1170,8 +1505,8 @@ class PrefDialog(QDialog):
 
         # Set the widths of the comboboxes and labels to the width of the
         # longest control
-        width = max(widget.width() for widget in self.widget_mapper.values())
-        for widget in self.widget_mapper.values():
+        width = max(widget.width() for widget in self.mapped_widgets)
+        for widget in self.mapped_widgets:
             widget.setMinimumWidth(width)
 
         # Set the scroll area to be big enough to eliminate the horizontal scrollbar
@@ -1206,65 +1541,84 @@ class PrefDialog(QDialog):
         """
 
         colorLabel = QLabel(" ")
-        colorLabel.setStyleSheet("QLabel {background-color: %s;}" % color)
-        size = QFontMetrics(QFont()).height()
-        colorLabel.setFixedSize(QSize(size, size))
+        try:
+            stylesheet = self._color_label_stylesheet[color]
+        except KeyError:
+            stylesheet = "QLabel {background-color: %s;}" % color
+            self._color_label_stylesheet[color] = stylesheet
+        colorLabel.setStyleSheet(stylesheet)
+        colorLabel.setFixedSize(self._color_label_size)
         return colorLabel
 
+    @pyqtSlot()
+    def loadSampleFile(self) -> None:
+        """
+        Create the sample file used to generate the example name, and
+        generate the example with it
+        """
+
+        self.sample_rpd_file = make_sample_rpd_file(
+            sample_rpd_file=self._pending_sample_rpd_file,
+            sample_job_code=self.prefs.most_recent_job_code(missing=_("Job Code")),
+            prefs=self.prefs,
+            generation_type=self.generation_type,
+        )
+        self._pending_sample_rpd_file = None
+        self.updateExampleFilename()
+
     def updateExampleFilename(self) -> None:
 
+        if self.sample_rpd_file is None:
+            # The sample file is still being prepared: the example will be
+            # generated as soon as it is ready
+            self.example.setText(_("Loading..."))
+            return
+
         user_pref_list = self.editor.user_pref_list
         self.user_pref_colors = self.editor.user_pref_colors
 
         if not self.is_subfolder:
             self.user_pref_colors.append(self.filename_pref_color)
 
-        self.messageWidget.setCurrentIndex(0)
+        # This slot runs on every keystroke in the editor: avoid re-resolving
+        # the same attribute chain for each message update
+        setMessageIndex = self.messageWidget.setCurrentIndex
+        upl = user_pref_list
+
+        setMessageIndex(0)
 
         if self.is_subfolder:
-            if user_pref_list:
-                try:
-                    user_pref_list.index(SEPARATOR)
-                except ValueError:
+            if upl:
+                if SEPARATOR not in upl:
                     # Inform the user that a subfolder separator (os.sep) is used to
                     # create subfolder levels
-                    self.messageWidget.setCurrentIndex(2)
-                else:
-                    if (
-                        user_pref_list[0] == SEPARATOR
-                        or user_pref_list[-3] == SEPARATOR
-                    ):
-                        # inform the user that there is no need to start or finish
-                        # with a subfolder separator (os.sep)
-                        self.messageWidget.setCurrentIndex(3)
+                    setMessageIndex(2)
+                elif upl[0] == SEPARATOR or upl[-3] == SEPARATOR:
+                    # inform the user that there is no need to start or finish
+                    # with a subfolder separator (os.sep)
+                    setMessageIndex(3)
             else:
                 # Inform the user that a subfolder separator (os.sep) is used to create
                 # subfolder levels
-                self.messageWidget.setCurrentIndex(2)
+                setMessageIndex(2)
 
             changed, user_pref_list, self.user_pref_colors = filter_subfolder_prefs(
                 user_pref_list, self.user_pref_colors
             )
         else:
-            try:
-                user_pref_list.index(SEQUENCES)
-            except ValueError:
+            if SEQUENCES not in upl:
                 # Inform the user that sequences can be used to make filenames unique
-                self.messageWidget.setCurrentIndex(2)
-
-        if self.generation_type == NameGenerationType.photo_name:
-            self.name_generator = gn.PhotoName(user_pref_list)
-        elif self.generation_type == NameGenerationType.video_name:
-            self.name_generator = gn.VideoName(user_pref_list)
-        elif self.generation_type == NameGenerationType.photo_subfolder:
-            self.name_generator = gn.PhotoSubfolder(user_pref_list)
-        else:
-            assert self.generation_type == NameGenerationType.video_subfolder
-            self.name_generator = gn.VideoSubfolder(user_pref_list)
+                setMessageIndex(2)
+
+        if self.editor.highlighter.highlighting_disabled:
+            setMessageIndex(self.highlighting_message_index)
+
+        self.name_generator.set_pref_list(user_pref_list)
 
         self.name_parts = self.name_generator.generate_name(
             self.sample_rpd_file, parts=True
         )
+        self._example_cache = None
         self.showExample()
         self.updateComboBoxCurrentIndex()
 
@@ -1300,32 +1654,70 @@ class PrefDialog(QDialog):
 
         user_pref_colors = self.user_pref_colors
 
+        cache_key = (
+            self.example.width(),
+            tuple(self.name_parts),
+            tuple(user_pref_colors),
+            self.is_subfolder,
+        )
+        if self._example_cache is not None and self._example_cache[0] == cache_key:
+            key, name, name_generation_problem = self._example_cache
+            if name_generation_problem:
+                self.messageWidget.setCurrentIndex(1)
+            self._setExampleText(name)
+            return
+
         parts = copy.copy(self.name_parts)
-        metrics = QFontMetrics(self.example.font())
+        # The example label's font effectively never changes, so reuse the
+        # font metrics from the previous call whenever possible
+        font = self.example.font()
+        if self._example_metrics is None or font.key() != self._example_font_key:
+            self._example_metrics = QFontMetrics(font)
+            self._example_font_key = font.key()
+        metrics = self._example_metrics
         width = self.example.width() - metrics.width("…")
 
         # Cannot elide rich text using Qt code. Thus, elide the plain text.
         plain_text_name = "".join(parts)
+        unfiltered_len = len(plain_text_name)
 
         if self.is_subfolder:
             plain_text_name = self.name_generator.filter_subfolder_characters(
                 plain_text_name
             )
         elided_text = metrics.elidedText(plain_text_name, Qt.ElideRight, width)
-        elided = False
-
-        while plain_text_name != elided_text:
-            elided = True
-            parts = remove_last_char_from_list_str(parts)
-            plain_text_name = "".join(parts)
-            if self.is_subfolder:
-                plain_text_name = self.name_generator.filter_subfolder_characters(
-                    plain_text_name
-                )
-            elided_text = metrics.elidedText(plain_text_name, Qt.ElideRight, width)
+        elided = plain_text_name != elided_text
 
+        if elided:
+            if len(plain_text_name) == unfiltered_len:
+                # elidedText already identified the fit point: keep that many
+                # characters, dropping the ellipsis character it appended
+                excess = len(plain_text_name) - (len(elided_text) - 1)
+                while excess > 0 and parts:
+                    last = parts[-1]
+                    if len(last) <= excess:
+                        excess -= len(last)
+                        parts.pop()
+                    else:
+                        parts[-1] = last[:-excess]
+                        excess = 0
+            else:
+                # Subfolder filtering changed the string's length, so the
+                # fit point cannot be mapped directly back onto the parts:
+                # trim one character at a time until the name fits
+                while plain_text_name != elided_text:
+                    parts = remove_last_char_from_list_str(parts)
+                    plain_text_name = "".join(parts)
+                    plain_text_name = self.name_generator.filter_subfolder_characters(
+                        plain_text_name
+                    )
+                    elided_text = metrics.elidedText(
+                        plain_text_name, Qt.ElideRight, width
+                    )
+
+        span_prefix = self._color_span_prefix
         colored_parts = [
-            '<span style="color: {};">{}</span>'.format(color, part) if color else part
+            span_prefix[color] + part + "</span>" if color else part
             for part, color in zip(parts, user_pref_colors)
         ]
 
@@ -1339,11 +1731,29 @@ class PrefDialog(QDialog):
         if self.sample_rpd_file.name_generation_problem:
             self.messageWidget.setCurrentIndex(1)
 
-        self.example.setTextFormat(Qt.RichText)
-        self.example.setText(name)
+        self._example_cache = (
+            cache_key,
+            name,
+            self.sample_rpd_file.name_generation_problem,
+        )
+
+        self._setExampleText(name)
+
+    def _setExampleText(self, name: str) -> None:
+        """
+        Set the example label's rich text only when it differs from what is
+        already displayed, as setting rich text triggers a full document
+        parse and relayout inside Qt
+        """
+
+        if name != self._last_example_html:
+            self._last_example_html = name
+            self.example.setTextFormat(Qt.RichText)
+            self.example.setText(name)
 
     def resizeEvent(self, event: QResizeEvent) -> None:
-        if self.example.text():
+        # Height-only changes cannot affect the eliding of the example
+        if self.example.text() and event.oldSize().width() != event.size().width():
             self.showExample()
         super().resizeEvent(event)
 
@@ -1363,36 +1773,59 @@ class PrefDialog(QDialog):
         """
 
         preset_class = self.preset.currentData()
-        if preset_class == PresetClass.new_preset:
-            createPreset = CreatePreset(existing_custom_names=self.preset_names)
-            if createPreset.exec():
-                # User has created a new preset
-                preset_name = createPreset.presetName()
-                assert preset_name not in self.preset_names
-                self.current_custom_name = preset_name
-                self.preset.addCustomPreset(preset_name)
-                self.saveNewPreset(preset_name=preset_name)
-                if len(self.preset_names) == 1:
-                    self.preset.setRemoveAllCustomEnabled(True)
-                self.preset.setSaveNewCustomPresetEnabled(enabled=False)
-            else:
-                # User cancelled creating a new preset
-                self.updateComboBoxCurrentIndex()
-        elif preset_class in (PresetClass.builtin, PresetClass.custom):
-            index = self.combined_pref_names.index(self.preset.currentText())
-            pref_list = self.combined_pref_lists[index]
-            self.editor.displayPrefList(pref_list=pref_list)
-            if index >= len(self.builtin_pref_names):
-                self.movePresetToFront(index=len(self.builtin_pref_names) - index)
-        elif preset_class == PresetClass.remove_all:
-            self.preset.removeAllCustomPresets(no_presets=len(self.preset_names))
-            self.clearCustomPresets()
-            self.preset.setRemoveAllCustomEnabled(False)
-            self.updateComboBoxCurrentIndex()
-        elif preset_class == PresetClass.update_preset:
-            self.updateExistingPreset()
+        handler = self._preset_dispatch.get(preset_class)
+        if handler is not None:
+            handler()
+
+    def _newPresetActivated(self) -> None:
+        """
+        Prompt the user to create a new custom preset, and save it if they do
+        """
+
+        createPreset = CreatePreset(existing_custom_names=self.preset_names)
+        if createPreset.exec():
+            # User has created a new preset
+            preset_name = createPreset.presetName()
+            assert preset_name not in self.preset_names
+            self.current_custom_name = preset_name
+            self.preset.addCustomPreset(preset_name)
+            self.saveNewPreset(preset_name=preset_name)
+            if len(self.preset_names) == 1:
+                self.preset.setRemoveAllCustomEnabled(True)
+            self.preset.setSaveNewCustomPresetEnabled(enabled=False)
+        else:
+            # User cancelled creating a new preset
             self.updateComboBoxCurrentIndex()
 
+    def _presetSelected(self) -> None:
+        """
+        Display the built-in or custom preset the user chose in the editor
+        """
+
+        index = self.combined_pref_names.index(self.preset.currentText())
+        pref_list = self.combined_pref_lists[index]
+        self.editor.displayPrefList(pref_list=pref_list)
+        if index >= len(self.builtin_pref_names):
+            self.movePresetToFront(index=len(self.builtin_pref_names) - index)
+
+    def _removeAllPresetsActivated(self) -> None:
+        """
+        Remove all of the user's custom presets
+        """
+
+        self.preset.removeAllCustomPresets(no_presets=len(self.preset_names))
+        self.clearCustomPresets()
+        self.preset.setRemoveAllCustomEnabled(False)
+        self.updateComboBoxCurrentIndex()
+
+    def _updatePresetActivated(self) -> None:
+        """
+        Overwrite the current custom preset with the editor's pref list
+        """
+
+        self.updateExistingPreset()
+        self.updateComboBoxCurrentIndex()
+
     def updateExistingPreset(self) -> None:
         """
         Updates (saves) an existing preset (assumed to be self.current_custom_name)
@@ -1489,11 +1922,34 @@ class PrefDialog(QDialog):
         )
         self._updateCombinedPrefs()
 
+    @property
+    def combined_pref_names(self) -> List[str]:
+        """
+        Built-in and custom preset names as one list, rebuilt lazily after
+        the presets are modified
+        """
+
+        if self._combined_pref_names is None:
+            self._combined_pref_names = self.builtin_pref_names + self.preset_names
+        return self._combined_pref_names
+
+    @property
+    def combined_pref_lists(self) -> Tuple[List[str], ...]:
+        """
+        Built-in and custom preset pref lists as one tuple, rebuilt lazily
+        after the presets are modified
+        """
+
+        if self._combined_pref_lists is None:
+            self._combined_pref_lists = self.builtin_pref_lists + tuple(
+                self.preset_pref_lists
+            )
+        return self._combined_pref_lists
+
     def _updateCombinedPrefs(self):
-        self.combined_pref_names = self.builtin_pref_names + self.preset_names
-        self.combined_pref_lists = self.builtin_pref_lists + tuple(
-            self.preset_pref_lists
-        )
+        self._combined_pref_names = None
+        self._combined_pref_lists = None
+        self._preset_match_cache = None
 
     def getPresetMatch(self) -> Tuple[int, int]:
         """
@@ -1501,10 +1957,20 @@ class PrefDialog(QDialog):
         if the current user pref list matches an entry in it. Else Tuple of (-1, -1).
         """
 
-        index = match_pref_list(
-            pref_lists=self.combined_pref_lists,
-            user_pref_list=self.editor.user_pref_list,
-        )
+        # match_pref_list() compares the user pref list element by element
+        # against every preset, and runs on each keystroke: reuse the last
+        # result when neither the user pref list nor the presets changed.
+        # The combobox index is not cached because edited / new entries
+        # shift item positions independently of the presets.
+        key = tuple(self.editor.user_pref_list)
+        if self._preset_match_cache is not None and self._preset_match_cache[0] == key:
+            index = self._preset_match_cache[1]
+        else:
+            index = match_pref_list(
+                pref_lists=self.combined_pref_lists,
+                user_pref_list=self.editor.user_pref_list,
+            )
+            self._preset_match_cache = (key, index)
         if index >= 0:
             combobox_name = self.combined_pref_names[index]
             return self.preset.findText(combobox_name), index